@@ -2,6 +2,8 @@
 
 import imp
 import getopt
+import itertools
+import multiprocessing
 import optparse
 import os
 import sys
@@ -10,11 +12,18 @@ import traceback
 import game_state
 import game_player
 import game_controller
+import game_memory
+import game_metrics
+import game_profile
 
 MAX_EXPAND = 15
 USAGE_STRING = \
-"\nUsage 1: %prog [-m | -a] [-e MAX_EXPAND] GAME PLAYER1 PLAYER2\n"\
-"Usage 2: %prog -t [-v] [-e MAX_EXPAND] [-x PLAYER] GAME\n\n"\
+"\nUsage 1: %prog [-m | -a] [-e MAX_EXPAND] [-T SECONDS] [-B SECONDS] "\
+	"[-M FILE] [--profile PREFIX [--sample]] [--memory] [--memory-cap MB] "\
+	"GAME PLAYER1 PLAYER2\n"\
+"Usage 2: %prog -t [-v] [-e MAX_EXPAND] [-T SECONDS] [-B SECONDS] [-x PLAYER] "\
+	"[-j JOBS] [-M FILE] [--profile PREFIX [--sample]] [--memory] "\
+	"[--memory-cap MB] GAME\n\n"\
 "GAME specifies the game to be played (see README)\n"\
 "PLAYER1, PLAYER2 specify player modules to use for first and second player\n"\
 	"\trespectively"
@@ -72,7 +81,8 @@ def call_name(mod, name, *args):
 	
 
 def play_game(gameName, p1Name, p2Name, maxExpansions, p1alphabeta, \
-		p2alphabeta):
+		p2alphabeta, moveTime=None, timeBank=None, metrics=None,
+		profiler=None, memory=None):
 	"""Plays a game.
 	
 	"gameName" is the name of the Python module, in the working directory or
@@ -95,7 +105,21 @@ def play_game(gameName, p1Name, p2Name, maxExpansions, p1alphabeta, \
 	player as they search during one turn.
 	
 	"p*alphabeta" is a boolean indicating whether alpha-beta is used or not for
-	player1 and player 2, respectively."""
+	player1 and player 2, respectively.
+	
+	"moveTime" is the most time, in seconds, a player may take over one move,
+	and "timeBank" the most it may take over a whole game (None for no
+	limit).  A player who takes longer forfeits.
+	
+	"metrics" is the name of a file to write a record of every move of the
+	games to when the user stops playing (see game_metrics.write_records()),
+	or None.
+	
+	"profiler" is an optional game_profile.Profiler to profile the games
+	with.
+	
+	"memory" is an optional game_memory.MemoryMonitor to measure the memory
+	each move takes, and hold the players to a cap, with."""
 	wd = os.getcwd()
 	# Load game, player modules
 	gameMod = load_module(gameName.lower(), None, wd)
@@ -122,7 +146,8 @@ def play_game(gameName, p1Name, p2Name, maxExpansions, p1alphabeta, \
 	# Create a game controller
 	try:
 		gm = game_controller.GameController(state, [p1,p2], [fn1,fn2],
-											maxExpansions, wd)
+											maxExpansions, wd, moveTime,
+											timeBank, profiler, memory)
 	except game_controller.PlayerException, e:
 		print "Player ID not covered!"
 		print e
@@ -130,11 +155,16 @@ def play_game(gameName, p1Name, p2Name, maxExpansions, p1alphabeta, \
 		
 	# keep playing til user wants to stop
 	playOn = True	
+	records = []
+	games = 0
 	while playOn:
 		# Reset the game
 		gm.reset()
 		# Play the game
 		winner = gm.play_game()
+		games += 1
+		for r in gm.get_move_records():
+			records.append(dict(r, game=games))
 		if winner == None:
 			print "Game is a draw!"
 		else:
@@ -144,6 +174,11 @@ def play_game(gameName, p1Name, p2Name, maxExpansions, p1alphabeta, \
 			else:
 				winnerName = p2.get_name()
 			print winnerName, "wins!"
+		if moveTime != None or timeBank != None:
+			for p in [p1, p2]:
+				times = gm.get_move_times(p.get_game_id())
+				print "%s took %.3f seconds over %d moves (longest %.3f)" % \
+						(p.get_name(), sum(times), len(times), max(times + [0]))
 		
 		# get valid input
 		while True:
@@ -155,9 +190,70 @@ def play_game(gameName, p1Name, p2Name, maxExpansions, p1alphabeta, \
 				break
 			else:
 				print "Please input 'y' or 'n'"
+	
+	if metrics != None:
+		game_metrics.write_records(metrics, records)
+	if metrics != None or memory != None:
+		print
+		print "Time per move and expansions used:"
+		for line in game_metrics.summarize(records):
+			print line
+
+
+def play_pairing(gm, playerMods, playerNames, playerIDs, i, j, quiet):
+	"""Plays one tournament game between player modules i and j, as first
+	and second player, on the GameController "gm".  Each game gets fresh
+	player objects, so its result doesn't depend on which games were played
+	before it (or in which process).
+	
+	"playerMods", "playerNames" are the lists of player modules and names.
+	"playerIDs" is the list of player IDs returned by get_players().
+	"quiet" is as for play_tournament() below.
+	
+	Returns a 2-tuple (winner, records): the winner's game ID, or None if the
+	game is a draw, and the game's move records (see
+	GameController.get_move_records())."""
+	p1 = call_name(playerMods[i], "make_player", playerNames[i], playerIDs[0])
+	p2 = call_name(playerMods[j], "make_player", playerNames[j], playerIDs[1])
+	gm.reset()
+	gm.setup_players([p1, p2], [game_controller.GameController.TOURN] * 2)
+	# Play the game using tournament functions
+	winner = gm.play_game(quiet)
+	return (winner, list(gm.get_move_records()))
+
+# What a tournament worker process needs to play its games: the arguments to
+# play_pairing() before "i", as set up by init_tournament_worker()
+tournamentWorker = None
+
+def init_tournament_worker(gameName, playerNames, maxExpansions, wd, moveTime,
+							timeBank, memory):
+	"""Sets up a worker process of a parallel tournament (see
+	play_tournament()), loading the game and player modules once for all the
+	games it plays."""
+	global tournamentWorker
+	gameMod = load_module(gameName.lower(), None, wd)
+	playerMods = [load_module(x, \
+						os.path.join(PLAYER_PATH, gameName.lower()), wd) \
+					for x in playerNames]
+	state = call_name(gameMod, "make_state")
+	playerIDs = state.get_players()
+	players = [call_name(playerMods[i], "make_player", playerNames[i], \
+					playerIDs[i]) for i in range(2)]
+	gm = game_controller.GameController(state, players, \
+				[game_controller.GameController.TOURN] * 2, maxExpansions, wd, \
+				moveTime, timeBank, None, memory)
+	tournamentWorker = (gm, playerMods, playerNames, playerIDs)
 
+def play_tournament_game(pairing):
+	"""Plays one game of a parallel tournament in a worker process, quietly.
+	
+	"pairing" is a tuple (i, j) as for play_pairing()."""
+	i, j = pairing
+	return play_pairing(*(tournamentWorker + (i, j, True)))
 
-def play_tournament(gameName, exclusions, maxExpansions, quiet):
+def play_tournament(gameName, exclusions, maxExpansions, quiet, jobs=1,
+					moveTime=None, timeBank=None, metrics=None, profiler=None,
+					memory=None):
 	"""Runs a tournament between all the game players it can find for the indicated
 	game.
 	
@@ -169,7 +265,18 @@ def play_tournament(gameName, exclusions, maxExpansions, quiet):
 	"maxExpansions" is as for play_game() above.
 	
 	"quiet" indicates that the program should refrain from outputting each and
-	every game state as games are played, if True."""
+	every game state as games are played, if True.
+	
+	"jobs" is the number of processes to play games in.  With more than one,
+	the games are played quietly in a pool of worker processes, but results
+	are still reported in the same order, and add up to the same scores, as
+	when they're played one after another.
+	
+	"moveTime", "timeBank", "metrics", "profiler", "memory" are as for
+	play_game() above; a profiler can only be used with one job, while each
+	worker process gets a copy of the memory monitor.  Each
+	player's time per move and use of its expansions are summarized after
+	the scores."""
 	wd = os.getcwd()
 	
 	# Load game module
@@ -218,39 +325,51 @@ def play_tournament(gameName, exclusions, maxExpansions, quiet):
 		gm = game_controller.GameController(state, \
 					[players[0][0],players[1][1]], \
 					playerFns, \
-					maxExpansions, wd)
+					maxExpansions, wd, moveTime, timeBank, profiler, memory)
 	except game_controller.PlayerException, e:
 		print "Player ID not covered!"
 		print e
 		sys.exit(3)
 	
-	# Play every player as player 1
-	for i, p1 in enumerate(players):
-		# Against every other player as player 2
-		for j, p2 in enumerate(players):
-			if i == j:
-				continue
-			
-			# Reset the game
-			gm.reset()
-			gm.setup_players([p1[0], p2[1]], playerFns)
-			# Play the game using tournament functions
-			winner = gm.play_game(quiet)
-			
-			# Output results
-			if winner == None:
-				print p1[0].get_name(), "vs.", p2[1].get_name(), "is a draw"
-				continue
-			winnerName = p1[0].get_name() if p1[0].get_game_id() == winner \
-							else p2[1].get_name()
-			print p1[0].get_name(), "vs.", p2[1].get_name(), "won by", \
-							winnerName
-			
-			# Increment winner's score
-			if winner == p1[0].get_game_id():
-				playerScores[i] += 1
-			else:
-				playerScores[j] += 1
+	# Play every player as player 1 against every other player as player 2
+	pairings = [(i, j) for i in range(len(players)) \
+					for j in range(len(players)) if i != j]
+	pool = None
+	if jobs > 1:
+		pool = multiprocessing.Pool(jobs, init_tournament_worker, \
+					(gameName, playerNames, maxExpansions, wd, moveTime, \
+					timeBank, memory))
+		# imap() hands the results back in the order of the pairings
+		results = pool.imap(play_tournament_game, pairings)
+	else:
+		results = (play_pairing(gm, playerMods, playerNames, playerIDs, \
+						i, j, quiet) for i, j in pairings)
+	
+	records = []
+	for k, ((i, j), (winner, gameRecords)) in \
+			enumerate(itertools.izip(pairings, results)):
+		p1 = players[i][0]
+		p2 = players[j][1]
+		for r in gameRecords:
+			records.append(dict(r, game=k + 1))
+		
+		# Output results
+		if winner == None:
+			print p1.get_name(), "vs.", p2.get_name(), "is a draw"
+			continue
+		winnerName = p1.get_name() if p1.get_game_id() == winner \
+						else p2.get_name()
+		print p1.get_name(), "vs.", p2.get_name(), "won by", winnerName
+		
+		# Increment winner's score
+		if winner == p1.get_game_id():
+			playerScores[i] += 1
+		else:
+			playerScores[j] += 1
+	
+	if pool != None:
+		pool.close()
+		pool.join()
 	
 	# Output final scores of all players
 	print
@@ -259,6 +378,13 @@ def play_tournament(gameName, exclusions, maxExpansions, quiet):
 	print "Final scores:"
 	for i,s in enumerate(playerScores):
 		print "Player %s: %d" % (players[i][0].get_name(), s)
+	print
+	print "Time per move and expansions used:"
+	for line in game_metrics.summarize(records):
+		print line
+	
+	if metrics != None:
+		game_metrics.write_records(metrics, records)
 	
 
 
@@ -287,13 +413,43 @@ def main():
 	parser.add_option("-e", "--max-expand", type="int", dest="maxExpand",
 		help="Set the maximum number of expansions per ply (default=%d)" \
 			% MAX_EXPAND, metavar="MAX_EXPAND")
+	parser.add_option("-T", "--time", type="float", dest="moveTime",
+		help="Allow each player at most SECONDS of wall-clock time per move "\
+		"(default: no limit).", metavar="SECONDS")
+	parser.add_option("-B", "--time-bank", type="float", dest="timeBank",
+		help="Allow each player at most SECONDS of wall-clock time over a "\
+		"whole game (default: no limit).", metavar="SECONDS")
 	parser.add_option("-x", "--exclude", action="append", dest="exclusions",
 		help="Exclude a player from the tournament.  Use multiple --exclude " \
 		"to exclude many players.", metavar="PLAYER")
 	parser.add_option("-v", "--verbose", action="store_false", dest="quiet",
 		help="Print out all the game states in tournament mode.")
+	parser.add_option("-j", "--jobs", type="int", dest="jobs",
+		help="Play tournament games in JOBS processes at once (default=1).",
+		metavar="JOBS")
+	parser.add_option("-M", "--metrics", dest="metrics",
+		help="Write a record of every move (time taken, expansions used, "\
+		"etc.) to FILE: JSON if its name ends in .json, CSV otherwise.",
+		metavar="FILE")
+	parser.add_option("--profile", dest="profile",
+		help="Profile the games, each player's moves and the controller "\
+		"apart, and write the results to files starting with PREFIX: "\
+		"PREFIX.collapsed for flame graphs, and a .pstats file for each "\
+		"player.", metavar="PREFIX")
+	parser.add_option("--sample", action="store_true", dest="sample",
+		help="Profile by sampling the stack every %g ms of CPU time instead, "\
+		"which slows the players down much less (no .pstats files)." \
+			% (game_profile.SAMPLE_INTERVAL * 1000))
+	parser.add_option("--memory", action="store_true", dest="memory",
+		help="Measure the memory each move takes (the peak and retained "\
+		"growth of the process's resident set size).")
+	parser.add_option("--memory-cap", type="float", dest="memoryCap",
+		help="Allow each player at most MB megabytes of memory kept over a "\
+		"game plus used in its current move; a player who goes over "\
+		"forfeits.  Implies --memory.", metavar="MB")
 	parser.set_defaults(alphabeta=False, minimax=False, tournament=False,
-		maxExpand=MAX_EXPAND, exclusions=[], quiet=True)
+		maxExpand=MAX_EXPAND, exclusions=[], quiet=True, jobs=1, sample=False,
+		memory=False)
 	
 	# Parse the arguments
 	opts, args = parser.parse_args()
@@ -314,6 +470,34 @@ def main():
 	if opts.alphabeta2:
 		p2alphabeta = True
 	
+	# Time limits must leave some time to move in
+	for limit in [opts.moveTime, opts.timeBank]:
+		if limit != None and limit <= 0:
+			print "Error: --time and --time-bank must be positive."
+			sys.exit(1)
+	
+	profiler = None
+	if opts.sample and not opts.profile:
+		print "Error: --sample needs --profile."
+		sys.exit(1)
+	if opts.profile:
+		if opts.jobs != 1:
+			print "Error: --profile is compatible only with --jobs 1."
+			sys.exit(1)
+		if opts.sample:
+			profiler = game_profile.SamplingProfiler()
+		else:
+			profiler = game_profile.CallProfiler()
+	
+	memory = None
+	if opts.memoryCap != None:
+		if opts.memoryCap <= 0:
+			print "Error: --memory-cap must be positive."
+			sys.exit(1)
+		memory = game_memory.MemoryMonitor(int(opts.memoryCap * 1048576))
+	elif opts.memory:
+		memory = game_memory.MemoryMonitor()
+	
 	# Playing a tournament
 	if opts.tournament:
 		if len(args) != 1:
@@ -331,8 +515,14 @@ def main():
 		# Get the game name
 		gameName = args[0]
 		
+		if opts.jobs < 1:
+			print "Error: --jobs must be at least 1."
+			sys.exit(1)
+		
 		# Run the tournament
-		play_tournament(gameName, opts.exclusions, opts.maxExpand, opts.quiet)
+		play_tournament(gameName, opts.exclusions, opts.maxExpand, opts.quiet,
+						opts.jobs, opts.moveTime, opts.timeBank, opts.metrics,
+						profiler, memory)
 		
 	# Just playing one player against another
 	else:
@@ -341,6 +531,10 @@ def main():
 			print "Error: Player exclusions are compatible only with "\
 					"tournament play.  Use '-h' for more information."
 			sys.exit(1)
+		if opts.jobs != 1:
+			print "Error: --jobs is compatible only with "\
+					"tournament play.  Use '-h' for more information."
+			sys.exit(1)
 		
 		# There should be three args which are not options
 		if len(args) != 3:
@@ -357,7 +551,15 @@ def main():
 			"using", "alpha-beta" if p1alphabeta or p2alphabeta else "minimax", "planning.\n"
 		
 		# Go ahead and play
-		play_game(gameName, p1Name, p2Name, opts.maxExpand, p1alphabeta, p2alphabeta)
+		play_game(gameName, p1Name, p2Name, opts.maxExpand, p1alphabeta, p2alphabeta,
+					opts.moveTime, opts.timeBank, opts.metrics, profiler, memory)
+	
+	if profiler != None:
+		print
+		print "Time profiled, by player and call site:"
+		for line in profiler.summarize():
+			print line
+		print "Profile written to", ", ".join(profiler.save(opts.profile))
 
 if __name__ == "__main__":
 	main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+
+import gc
+import json
+import optparse
+import os
+import platform
+import random
+import sys
+import time
+
+import game
+
+USAGE_STRING = \
+"\nUsage: %prog [-n REPEAT] [-s FILE] [-c FILE [-t PERCENT]] [GAME ...]\n"\
+"       %prog [-n REPEAT] -b SIZES\n\n"\
+"Times GameState primitives of each GAME (default: Gobblet and Tictactoe)\n"\
+"over a fixed set of positions, in microseconds per call.  With -s, saves\n"\
+"the results to FILE as a baseline; with -c, compares them with the\n"\
+"baseline in FILE and exits with status 1 if any got slower by more than\n"\
+"PERCENT (default=10).\n\n"\
+"With -b, instead times gobblet_eval's scoring of Gobblet boards in batches\n"\
+"of each of the comma-separated SIZES, with and without NumPy, in\n"\
+"microseconds per board, and reports the batch size from which NumPy is\n"\
+"faster (see gobblet_eval.BATCH_MIN)."
+
+GAMES = ["Gobblet", "Tictactoe"]
+# Positions in each game's corpus
+CORPUS_SIZE = 200
+# The corpus is the same from run to run
+CORPUS_SEED = 1
+# Each benchmark runs over the whole corpus for at least this long per repeat
+MIN_SECONDS = 0.1
+THRESHOLD = 10
+
+def reference(s, m, scratch, mod):
+	"""A fixed amount of plain Python work, timed along with the benchmarks
+	to tell how fast the machine was running (see compare())."""
+	total = 0
+	for k in xrange(20):
+		total += len([k, total])
+	return total
+
+# The benchmarks: name, what it does to one position of the corpus (given
+# the state, a legal move in it, a scratch state and the game module), and
+# the module function it needs, if any
+BENCHMARKS = [
+	("reference", reference, None),
+	("copy_into", lambda s, m, scratch, mod: s.copy_into(scratch), None),
+	("make_copy", lambda s, m, scratch, mod: s.make_copy(), None),
+	("repeated_rep", lambda s, m, scratch, mod: s.repeated_rep(), None),
+	("is_win", lambda s, m, scratch, mod: s.is_win(s.get_players()[0]), None),
+	("is_valid_move", lambda s, m, scratch, mod: s.is_valid_move(m), None),
+	("successor_moves", lambda s, m, scratch, mod: s.successor_moves(), None),
+	("successors", lambda s, m, scratch, mod: s.successors(), None),
+	("mirror", lambda s, m, scratch, mod: mod.mirror(s), "mirror"),
+	("rotations", lambda s, m, scratch, mod: mod.rotations(s), "rotations"),
+]
+
+def make_corpus(gameMod, size=CORPUS_SIZE, seed=CORPUS_SEED):
+	"""Returns a list of "size" 2-tuples (state, move) from random games of
+	a game module: positions where nobody has won yet, each with a legal
+	move.  The states have no move counter."""
+	rng = random.Random(seed)
+	corpus = []
+	state = game.call_name(gameMod, "make_state")
+	while len(corpus) < size:
+		moves = state.successor_moves()
+		if not moves or state.winner() is not None:
+			state = game.call_name(gameMod, "make_state")
+			continue
+		move = moves[rng.randrange(len(moves))]
+		corpus.append((state.make_copy(), move))
+		state.move(move)
+	return corpus
+
+def time_pass(fn, corpus, gameMod, scratch, passes):
+	"""Returns the time "passes" runs of a benchmark function over the
+	corpus take.  As with timeit, the garbage collector is kept out of the
+	timing."""
+	gc.collect()
+	enabled = gc.isenabled()
+	gc.disable()
+	try:
+		start = time.time()
+		for k in xrange(passes):
+			for s, m in corpus:
+				fn(s, m, scratch, gameMod)
+		return time.time() - start
+	finally:
+		if enabled:
+			gc.enable()
+
+def calibrate(fn, corpus, gameMod, scratch):
+	"""Returns the number of passes of a benchmark over the corpus that take
+	MIN_SECONDS, and their time."""
+	passes = 1
+	while True:
+		elapsed = time_pass(fn, corpus, gameMod, scratch, passes)
+		if elapsed >= MIN_SECONDS:
+			return (passes, elapsed)
+		passes *= 2
+
+def run_benchmarks(gameNames, repeat):
+	"""Returns a dictionary mapping each game name to a dictionary of its
+	benchmarks' times, in microseconds per position: the fastest of
+	"repeat" timings.  The benchmarks of a game take turns to be timed, so
+	a slow patch of the machine doesn't hit just one of them."""
+	results = {}
+	for gameName in gameNames:
+		gameMod = game.load_module(gameName.lower(), None, os.getcwd())
+		if gameMod == None:
+			sys.exit(2)
+		corpus = make_corpus(gameMod)
+		scratch = corpus[0][0].make_copy()
+		benchmarks = [(name, fn) for name, fn, needs in BENCHMARKS \
+						if needs is None or hasattr(gameMod, needs)]
+		passes = {}
+		best = {}
+		for name, fn in benchmarks:
+			passes[name], best[name] = calibrate(fn, corpus, gameMod, scratch)
+		for r in range(repeat - 1):
+			for name, fn in benchmarks:
+				best[name] = min(best[name], time_pass(fn, corpus, gameMod,
+												scratch, passes[name]))
+		results[gameName] = {}
+		for name, fn in benchmarks:
+			t = best[name] * 1e6 / (passes[name] * len(corpus))
+			results[gameName][name] = t
+			print "%-10s %-16s %10.2f us" % (gameName, name, t)
+		sys.stdout.flush()
+	return results
+
+def score_python(boards, players, scratch, mod):
+	"""Scores a batch of boards one at a time, as evaluate_children() does
+	below BATCH_MIN."""
+	import gobblet_eval
+	return [gobblet_eval.score_bits(bits, player) \
+				for bits, player in zip(boards, players)]
+
+def score_numpy(boards, players, scratch, mod):
+	"""Scores a batch of boards with NumPy, as evaluate_children() does from
+	BATCH_MIN up."""
+	import gobblet_eval
+	return gobblet_eval.evaluate_boards(boards, players).tolist()
+
+def run_batch_benchmarks(sizes, repeat):
+	"""Times Gobblet board scoring with and without NumPy in batches of each
+	of "sizes" boards, taken from the corpus, printing the microseconds per
+	board.  Returns the smallest size from which NumPy was faster at every
+	size, or None."""
+	import gobblet_eval
+	if gobblet_eval.numpy is None:
+		print "Error: NumPy is not installed."
+		sys.exit(2)
+	gameMod = game.load_module("gobblet", None, os.getcwd())
+	if gameMod == None:
+		sys.exit(2)
+	corpus = make_corpus(gameMod, max(sizes))
+	crossover = None
+	for size in sizes:
+		# time_pass() calls the function once per (state, move) pair, so the
+		# "corpus" here is the one batch
+		batch = [([s.bits[:] for s, m in corpus[:size]],
+					[s.player for s, m in corpus[:size]])]
+		# As in run_benchmarks(), the two take turns to be timed
+		fns = [score_python, score_numpy]
+		timings = [calibrate(fn, batch, gameMod, None) for fn in fns]
+		for r in range(repeat - 1):
+			timings = [(passes, min(best, time_pass(fn, batch, gameMod, None,
+											passes))) \
+						for fn, (passes, best) in zip(fns, timings)]
+		times = [best * 1e6 / (passes * size) for passes, best in timings]
+		print "%6d boards %8.2f us python %8.2f us numpy" \
+				% (size, times[0], times[1])
+		sys.stdout.flush()
+		if times[1] >= times[0]:
+			crossover = None
+		elif crossover is None:
+			crossover = size
+	return crossover
+
+def save_baseline(fname, results):
+	f = open(fname, "w")
+	try:
+		json.dump({"python": platform.python_version(),
+					"machine": platform.machine(),
+					"results": results}, f, indent=1, sort_keys=True)
+		f.write("\n")
+	finally:
+		f.close()
+
+def compare(fname, results, threshold):
+	"""Compares results with the baseline saved in a file, printing the
+	change in each benchmark they have in common.  Returns the list of
+	(game, benchmark) pairs more than "threshold" percent slower.
+
+	A machine shared with other work can run everything 20% or more slower
+	for a while, so each time is first scaled by how much faster or slower
+	the "reference" benchmark ran than in the baseline."""
+	f = open(fname)
+	try:
+		baseline = json.load(f)["results"]
+	finally:
+		f.close()
+	slower = []
+	for gameName in sorted(results):
+		old = baseline.get(gameName, {})
+		speed = 1.0
+		if old.get("reference"):
+			speed = results[gameName]["reference"] / old["reference"]
+			print "%-10s machine speed %+.1f%% against the baseline" \
+					% (gameName, (1 / speed - 1) * 100)
+		for name, t in sorted(results[gameName].items()):
+			old = baseline.get(gameName, {}).get(name)
+			if not old or name == "reference":
+				continue
+			t /= speed
+			change = (t - old) * 100.0 / old
+			flag = ""
+			if change > threshold:
+				flag = "  REGRESSION"
+				slower.append((gameName, name))
+			print "%-10s %-16s %10.2f us -> %10.2f us %+7.1f%%%s" \
+					% (gameName, name, old, t, change, flag)
+	return slower
+
+def main():
+	parser = optparse.OptionParser()
+	parser.set_usage(USAGE_STRING)
+	parser.add_option("-n", "--repeat", type="int", dest="repeat",
+		help="Time each benchmark REPEAT times and keep the fastest "\
+		"(default=7)", metavar="REPEAT")
+	parser.add_option("-s", "--save", dest="save",
+		help="Save the results as a baseline in FILE.", metavar="FILE")
+	parser.add_option("-c", "--compare", dest="compare",
+		help="Compare the results with the baseline in FILE.",
+		metavar="FILE")
+	parser.add_option("-t", "--threshold", type="float", dest="threshold",
+		help="Count a benchmark more than PERCENT slower than the baseline "\
+		"as a regression (default=%d)" % THRESHOLD, metavar="PERCENT")
+	parser.add_option("-b", "--batch", dest="batch",
+		help="Time batch scoring of Gobblet boards at each of the "\
+		"comma-separated SIZES instead.", metavar="SIZES")
+	parser.set_defaults(repeat=7, threshold=THRESHOLD)
+	opts, args = parser.parse_args()
+	if opts.repeat < 1:
+		print "Error: REPEAT must be at least 1."
+		sys.exit(1)
+
+	if opts.batch:
+		try:
+			sizes = sorted([int(size) for size in opts.batch.split(",")])
+		except ValueError:
+			sizes = []
+		if not sizes or min(sizes) < 1:
+			print "Error: SIZES must be positive integers, e.g. 16,64,256."
+			sys.exit(1)
+		if opts.save or opts.compare or args:
+			print "Error: -b can't be used with -s, -c or GAME."
+			sys.exit(1)
+		import gobblet_eval
+		crossover = run_batch_benchmarks(sizes, opts.repeat)
+		print
+		if crossover is None:
+			print "NumPy was slower at every size (BATCH_MIN is %d)" \
+					% gobblet_eval.BATCH_MIN
+		else:
+			print "NumPy is faster from %d boards (BATCH_MIN is %d)" \
+					% (crossover, gobblet_eval.BATCH_MIN)
+		return
+
+	results = run_benchmarks(args or GAMES, opts.repeat)
+	if opts.save:
+		save_baseline(opts.save, results)
+	if opts.compare:
+		print
+		slower = compare(opts.compare, results, opts.threshold)
+		if slower:
+			print
+			print "%d benchmark(s) slower by more than %g%%" \
+					% (len(slower), opts.threshold)
+			sys.exit(1)
+
+if __name__ == "__main__":
+	main()
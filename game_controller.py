@@ -1,8 +1,12 @@
 import copy
 import os
 import sys
+import time
 import traceback
 
+import game_memory
+import game_search
+
 class PlayerException(Exception):
 	"""An exception which is raised if the player objects provided to the 
 	GameController constructor don't line up with the GameState subclass's
@@ -14,9 +18,23 @@ class PlayerException(Exception):
 		return "Player not found %s" % repr(self.player)
 
 class GameExpansionCounter(object):
-	"""Allows many state objects to share one counter for their expansions"""
-	def __init__(self, count=0):
+	"""Allows many state objects to share one counter for their expansions,
+	and the time (a time.time() value, or None if there is no time limit)
+	by which the current move must be made"""
+	def __init__(self, count=0, deadline=None):
 		self.count = count
+		self.deadline = deadline
+
+# The fields of the records get_move_records() returns, in a sensible order
+# for a table: the ply (from 1), the player's game ID and name, the wall-clock
+# and CPU time the move took, in seconds, the expansions used and allowed,
+# the number of moves the player had to choose from, the player's search
+# statistics for the move (see game_search.SearchStats), and the memory the
+# move peaked at and retained, in bytes (None without a memory monitor)
+MOVE_FIELDS = ["ply", "player", "name", "wall", "cpu", "expansions",
+				"max_expansions", "successors"] \
+				+ game_search.SearchStats.FIELDS \
+				+ ["memory_peak", "memory_retained"]
 
 class GameController(object):
 	"""The central controller for a game of (whatever)."""
@@ -26,7 +44,8 @@ class GameController(object):
 	ALPHA_BETA = 1
 	TOURN = 2
 
-	def __init__(self, state, players, fns, max_expansions, wd):
+	def __init__(self, state, players, fns, max_expansions, wd, move_time=None,
+				time_bank=None, profiler=None, memory=None):
 		"""does initial setup of a game
 		
 		"state" is an object whose type is a game-specific subclass of GameState
@@ -38,6 +57,16 @@ class GameController(object):
 		  per turn.
 		"wd" is the working directory that should be restored after each player
 		  takes a turn.  (In case some player changes the wd and doesn't restore)
+		"move_time" is the most time, in seconds, each player may take over one
+		  move, or None for no limit.
+		"time_bank" is the total time, in seconds, each player may take over
+		  all its moves in a game, or None for no limit.
+		A player who goes over its time forfeits.
+		"profiler" is an optional game_profile.Profiler to profile the games
+		  with, each player's moves apart.
+		"memory" is an optional game_memory.MemoryMonitor to measure the
+		  memory each move takes with.  A player who goes over its cap
+		  forfeits.
 		
 		Raises PlayerException if there's a mismatch between players and gameIDs"""
 		# Reference and ready the game state
@@ -45,6 +74,7 @@ class GameController(object):
 		self.state.clear()
 		
 		# If game cycles, need state repetition detection
+		# (holds the states' repeated_rep() values -- plain int keys for Gobblet)
 		self.visitedStates = set()
 		
 		# Maps players' game IDs to player objects
@@ -59,9 +89,25 @@ class GameController(object):
 		self.expansionCounter = GameExpansionCounter(self.max_expansions)
 		self.state.set_counter(self.expansionCounter)
 		
+		# Time limits, and how long each player has taken over each move
+		self.move_time = move_time
+		self.time_bank = time_bank
+		self.moveTimes = {}
+		
+		# The moves made so far in the current game
+		self.history = []
+		# A record of how each move was made (see get_move_records())
+		self.moveRecords = []
+		# Each player's search statistics over the current game
+		self.searchStats = dict([(x, game_search.SearchStats()) \
+									for x in state.get_players()])
+		
 		# Note the wd in case players open files
 		self.wd = wd
 		
+		self.profiler = profiler
+		self.memory = memory
+		
 		# Insert players into map
 		self.setup_players(players, fns)
 	
@@ -93,6 +139,7 @@ class GameController(object):
 		fn in fns is an integer, one of MINIMAX, ALPHA_BETA, or TOURN,
 		indicating which of the players' move functions we should use."""
 		self.players.clear()
+		self.moveTimes.clear()
 		playersFns = zip(players,fns)
 		# Insert player IDs, objects into map
 		for p in self.state.get_players():
@@ -102,12 +149,65 @@ class GameController(object):
 					break
 			if p not in self.players:
 				raise PlayerException(p)
+			self.moveTimes[p] = []
 	
 	def reset(self):
 		"""Reset the game"""
 		self.clear_repeat()
 		self.state.clear()
 		self.nextPlayer = self.state.get_next_player()
+		for times in self.moveTimes.values():
+			del times[:]
+		del self.history[:]
+		del self.moveRecords[:]
+		for stats in self.searchStats.values():
+			stats.clear()
+		if self.memory is not None:
+			self.memory.reset()
+	
+	def play_moves(self, moves):
+		"""Makes "moves" from the current position as if the players had
+		made them (e.g., a random opening before the players take over), and
+		adds them to the history.  The moves must be legal and not end the
+		game."""
+		for move in moves:
+			self.nextPlayer, clear = self.state.move(move, True)
+			self.history.append(move)
+			if clear:
+				self.clear_repeat()
+			if self.state.repeats():
+				self.visitedStates.add(self.state.repeated_rep())
+	
+	def get_history(self):
+		"""Returns the list of moves made so far in the current game, in
+		order."""
+		return self.history
+	
+	def get_move_records(self):
+		"""Returns a list of dictionaries, one for each move a player has
+		returned in the current game (including one that lost it, e.g. by
+		being illegal), whose keys are MOVE_FIELDS."""
+		return self.moveRecords
+	
+	def get_search_stats(self, player):
+		"""Returns a game_search.SearchStats adding up the search statistics
+		of the indicated player's (a game ID) moves in the current game."""
+		return self.searchStats[player]
+	
+	def get_move_times(self, player):
+		"""Returns a list of the times, in seconds, the indicated player (a
+		game ID) has taken over each of its moves in the current game."""
+		return self.moveTimes[player]
+	
+	def time_allowed(self, player):
+		"""Returns the time, in seconds, the indicated player (a game ID) may
+		take over its next move, or None if there is no limit."""
+		allowed = self.move_time
+		if self.time_bank is not None:
+			left = self.time_bank - sum(self.moveTimes[player])
+			if allowed is None or left < allowed:
+				allowed = left
+		return allowed
 	
 	def game_move(self):
 		"""Make one move (one ply) within the game.
@@ -129,7 +229,8 @@ class GameController(object):
 		# player has won or it's a draw
 		# self.expansions = 1
 		self.expansionCounter.count = 1
-		if len(self.state.successors()) == 0:
+		successors = sum(1 for m in self.state.iter_successor_moves())
+		if successors == 0:
 			if self.state.is_win(otherPlayer):
 				return (None, otherPlayer)
 			else:
@@ -139,6 +240,14 @@ class GameController(object):
 		# allow the player max_expansions for this turn
 		# self.expansions = self.max_expansions
 		self.expansionCounter.count = self.max_expansions
+		allowed = self.time_allowed(self.nextPlayer)
+		# Garbage left by the last move isn't this player's
+		if self.memory is not None:
+			game_memory.collect()
+		start = time.time()
+		startCPU = time.clock()
+		self.expansionCounter.deadline = None if allowed is None \
+											else start + allowed
 		
 		# are we using alpha-beta, minimax, or tournament?
 		fn = self.players[self.nextPlayer][1]
@@ -155,9 +264,51 @@ class GameController(object):
 		
 		# player may throw an exception
 		try:
+			stats = self.players[self.nextPlayer][0].get_stats()
+			stats.clear()
 			# get player's move, make sure we don't modify the current state
-			move = move_fun(self.state.get_player_state(self.nextPlayer), 
-							set(self.visitedStates))
+			playerState = self.state.get_player_state(self.nextPlayer)
+			visited = set(self.visitedStates)
+			memoryUsed = (None, None)
+			if self.memory is not None:
+				self.memory.start(self.nextPlayer)
+			try:
+				if self.profiler is None:
+					move = move_fun(playerState, visited)
+				else:
+					move = self.profiler.call(
+								self.players[self.nextPlayer][0].get_name(),
+								move_fun, playerState, visited)
+			finally:
+				# Collecting the garbage after the move isn't timed
+				elapsed = time.time() - start
+				cpu = time.clock() - startCPU
+				if self.memory is not None:
+					memoryUsed = self.memory.stop()
+			self.moveTimes[self.nextPlayer].append(elapsed)
+			record = {"ply": len(self.moveRecords) + 1,
+				"player": self.nextPlayer,
+				"name": self.players[self.nextPlayer][0].get_name(),
+				"wall": elapsed, "cpu": cpu,
+				"expansions": self.max_expansions \
+								- max(self.expansionCounter.count, 0),
+				"max_expansions": self.max_expansions,
+				"successors": successors,
+				"memory_peak": memoryUsed[0],
+				"memory_retained": memoryUsed[1]}
+			record.update(stats.as_dict())
+			self.moveRecords.append(record)
+			self.searchStats[self.nextPlayer].add(stats)
+			# player may take too long
+			if allowed is not None and elapsed > allowed:
+				print "Player", self.nextPlayer, "(", \
+						self.players[self.nextPlayer][0].get_name(), \
+						") ran out of time after %.3f seconds." % elapsed
+				return (move, otherPlayer)
+			# player may use too much memory (and catch MemoryCapExceeded)
+			if self.memory is not None and self.memory.over_cap():
+				self.memory_forfeit()
+				return (move, otherPlayer)
 			# player may give up
 			if move.is_forfeit():
 				print "Player", self.nextPlayer, "forfeits."
@@ -171,8 +322,12 @@ class GameController(object):
 			lastPlayer = self.nextPlayer
 			# get the new next player and make the indicated move
 			self.nextPlayer, clear = self.state.move(move, True)
+			self.history.append(move)
 			if clear:
 				self.clear_repeat()
+		except game_memory.MemoryCapExceeded:
+			self.memory_forfeit()
+			return (None, otherPlayer)
 		except:
 			print "Exception thrown by player", self.nextPlayer, \
 						"(", self.players[self.nextPlayer][0].get_name(), ")"
@@ -197,21 +352,35 @@ class GameController(object):
 		# nobody's won or lost yet
 		return (move, None)
 	
+	def memory_forfeit(self):
+		"""Reports that the player to move went over its memory cap, and so
+		forfeits."""
+		print "Player", self.nextPlayer, "(", \
+				self.players[self.nextPlayer][0].get_name(), \
+				") went over its memory cap of %.1f MB." \
+				% (self.memory.cap / 1048576.0)
+	
 	def play_game(self, quiet=False):
 		"""Plays a complete game and returns winner's game ID, or None if a draw"""
-		# Just loop until everything's done
-		winner = None
-		while(winner == None):
+		if self.profiler is not None:
+			self.profiler.start()
+		try:
+			# Just loop until everything's done
+			winner = None
+			while(winner == None):
+				if not quiet:
+					print self.state
+				move, winner = self.game_move()
+				if move == None and winner == None:
+					return None
+				if move != None and not quiet:
+					print "%s:" % self.players[move.get_player()][0].get_name(), \
+										move
+					print 
 			if not quiet:
 				print self.state
-			move, winner = self.game_move()
-			if move == None and winner == None:
-				return None
-			if move != None and not quiet:
-				print "%s:" % self.players[move.get_player()][0].get_name(), \
-									move
-				print 
-		if not quiet:
-			print self.state
-		return winner
+			return winner
+		finally:
+			if self.profiler is not None:
+				self.profiler.stop()
 		
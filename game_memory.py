@@ -0,0 +1,138 @@
+import ctypes
+import ctypes.util
+import gc
+import os
+import resource
+import signal
+import sys
+
+# Memory accounting for the GameController (see its "memory" argument).
+# Python 2 has no tracemalloc, so this goes by the process's resident set
+# size (RSS), polled while each move is made: a move's peak is the most the
+# RSS grew above where it started, and what it retained is how much bigger
+# the RSS was at the end.  A player is charged what its own moves have
+# retained over the game so far plus what its current move uses, so one that
+# keeps adding to a list from move to move runs into its cap as surely as
+# one whose search blows up in a single move, and its opponent isn't charged
+# for it.
+#
+# Freed memory isn't always given back: Python keeps freed objects on free
+# lists, and malloc keeps freed blocks for reuse.  Before each sample that
+# counts, collect() gives back what it can, so that garbage isn't charged to
+# whoever happened to free it.  RSS takes in everything in the process, so
+# the figures are still rough, but leaks and blowups big enough to matter
+# show up clearly.
+
+# Seconds between polls of the RSS during a move
+POLL_INTERVAL = 0.01
+
+try:
+	PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+	PAGE_SIZE = 4096
+
+# glibc's malloc_trim(), which gives the system back the free memory at the
+# top of the heap and in its free blocks, or None where there isn't one
+try:
+	malloc_trim = ctypes.CDLL(ctypes.util.find_library("c")).malloc_trim
+except (OSError, AttributeError):
+	malloc_trim = None
+
+class MemoryCapExceeded(Exception):
+	"""Raised in the middle of a player's move when it goes over its memory
+	cap, so the controller can count it as a forfeit."""
+	pass
+
+def resident_bytes():
+	"""Returns the process's resident set size in bytes.  Where /proc isn't
+	available, returns its peak RSS instead, which only ever goes up, so
+	memory given back goes unnoticed."""
+	try:
+		f = open("/proc/self/statm")
+		try:
+			return int(f.read().split()[1]) * PAGE_SIZE
+		finally:
+			f.close()
+	except (IOError, IndexError, ValueError):
+		maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		# Kilobytes, except on Mac OS X
+		return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+def collect():
+	"""Gives back what freed memory it can: collects the garbage (which also
+	empties Python's free lists) and trims malloc's heap, where possible.  A
+	full collection takes milliseconds on a large heap."""
+	gc.collect()
+	if malloc_trim is not None:
+		malloc_trim(0)
+
+class MemoryMonitor(object):
+	"""Measures the memory each move takes, and stops a move that takes a
+	player over its cap by raising MemoryCapExceeded in it.  Polls with
+	SIGALRM, so Unix only, and only in the main thread.
+
+	A player may catch MemoryCapExceeded and carry on, so after each move,
+	check over_cap() as well."""
+
+	def __init__(self, cap=None, interval=POLL_INTERVAL):
+		""""cap" is the most memory, in bytes, each player may hold on to
+		over a game plus use in its current move, or None for no limit."""
+		self.cap = cap
+		self.interval = interval
+		# What each player's moves have retained in the current game
+		self.retained = {}
+		self.player = None
+		self.base = 0
+		self.peak = 0
+		# The RSS the current move may grow to, or None
+		self.limit = None
+
+	def reset(self):
+		"""Starts a new game."""
+		self.retained.clear()
+
+	def allowed(self):
+		"""Returns the RSS the current move may grow to, or None, given what
+		the player retained before it."""
+		if self.cap is None:
+			return None
+		return self.base + self.cap - max(self.retained.get(self.player, 0), 0)
+
+	def over_cap(self):
+		"""Returns True if the current (or last) move's peak went over the
+		cap."""
+		return self.limit is not None and self.peak > self.limit
+
+	def start(self, player):
+		"""Starts measuring a move of "player" (a game ID).  Call collect()
+		first, outside the time the move is charged for."""
+		self.player = player
+		self.base = self.peak = resident_bytes()
+		self.limit = self.allowed()
+		signal.signal(signal.SIGALRM, self.poll)
+		# Let system calls carry on after a poll instead of failing
+		signal.siginterrupt(signal.SIGALRM, False)
+		signal.setitimer(signal.ITIMER_REAL, self.interval, self.interval)
+
+	def stop(self):
+		"""Stops measuring the move, and returns a 2-tuple (peak, retained):
+		how far the RSS rose above where it started, and the change from
+		start to end once the garbage is collected, in bytes.  The change is
+		added to what the player has retained."""
+		signal.setitimer(signal.ITIMER_REAL, 0, 0)
+		signal.signal(signal.SIGALRM, signal.SIG_DFL)
+		self.peak = max(self.peak, resident_bytes())
+		collect()
+		retained = resident_bytes() - self.base
+		self.retained[self.player] = self.retained.get(self.player, 0) \
+										+ retained
+		return (self.peak - self.base, retained)
+
+	def poll(self, signum, frame):
+		"""The SIGALRM handler."""
+		rss = resident_bytes()
+		if rss > self.peak:
+			self.peak = rss
+			if self.over_cap():
+				signal.setitimer(signal.ITIMER_REAL, 0, 0)
+				raise MemoryCapExceeded()
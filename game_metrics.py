@@ -0,0 +1,118 @@
+import csv
+import json
+
+import game_controller
+
+# Exporting and summarizing the per-move records kept by GameController (see
+# GameController.get_move_records()).  Records from several games can be
+# pooled, each with an extra "game" field numbering its game.
+
+# Fields of exported records, in order
+FIELDS = ["game"] + game_controller.MOVE_FIELDS
+
+# Percentiles of the time per move in summaries
+PERCENTILES = [50, 95, 99]
+
+# Bins of the expansion-usage histograms in summaries: the share of the
+# expansions allowed that a move used, in tenths (the last bin includes all
+# of them)
+USAGE_BINS = 10
+
+def write_records(fname, records):
+	"""Writes move records to a file: as a JSON list of objects if the name
+	ends in ".json", otherwise as CSV with a header line."""
+	f = open(fname, "wb")
+	try:
+		if fname.lower().endswith(".json"):
+			json.dump(records, f, indent=1, sort_keys=True,
+						separators=(",", ": "))
+			f.write("\n")
+		else:
+			writer = csv.DictWriter(f, FIELDS, extrasaction="ignore")
+			writer.writerow(dict(zip(FIELDS, FIELDS)))
+			writer.writerows(records)
+	finally:
+		f.close()
+
+def percentile(values, p):
+	"""Returns the p-th percentile (0 < p <= 100) of a list of numbers, by
+	the nearest-rank method, or None if the list is empty."""
+	if not values:
+		return None
+	values = sorted(values)
+	rank = -(-len(values) * p // 100)
+	return values[max(rank, 1) - 1]
+
+def usage_histogram(records):
+	"""Returns a list of USAGE_BINS counts: how many of the moves used each
+	tenth (for the default 10 bins) of the expansions they were allowed."""
+	counts = [0] * USAGE_BINS
+	for r in records:
+		if r["max_expansions"] > 0:
+			share = float(r["expansions"]) / r["max_expansions"]
+			counts[min(int(share * USAGE_BINS), USAGE_BINS - 1)] += 1
+	return counts
+
+def search_summary(records):
+	"""Returns a string summarizing the search statistics of move records
+	(see game_search.SearchStats), or None if they show no searching: the
+	nodes per move, the mean effective branching factor, the share of the
+	cutoffs on the first move tried, the share of the table lookups that hit
+	and the deepest search."""
+	searched = [r for r in records if r.get("nodes")]
+	if not searched:
+		return None
+	factors = [r["nodes"] ** (1.0 / r["depth"]) for r in searched \
+				if r["depth"] > 0]
+	cutoffs = sum([r["cutoffs"] for r in searched])
+	probes = sum([r["table_probes"] for r in searched])
+	parts = ["%d nodes/move" % (sum([r["nodes"] for r in searched])
+								// len(searched))]
+	if factors:
+		parts.append("branching %.2f" % (sum(factors) / len(factors)))
+	if cutoffs:
+		parts.append("first-move cutoffs %.0f%%" % (100.0 \
+						* sum([r["first_cutoffs"] for r in searched]) / cutoffs))
+	if probes:
+		parts.append("table hits %.0f%%" % (100.0 \
+						* sum([r["table_hits"] for r in searched]) / probes))
+	parts.append("depth %d" % max([r["depth"] for r in searched]))
+	return ", ".join(parts)
+
+def memory_summary(records):
+	"""Returns a string summarizing the memory use in move records, or None
+	if it wasn't measured: the largest peak of a move, and the total
+	retained."""
+	measured = [r for r in records if r.get("memory_peak") is not None]
+	if not measured:
+		return None
+	return "peak %.1f MB, retained %.1f MB in all" \
+			% (max([r["memory_peak"] for r in measured]) / 1048576.0,
+				sum([r["memory_retained"] for r in measured]) / 1048576.0)
+
+def summarize(records):
+	"""Returns a list of lines summarizing move records by player name:
+	the percentiles of the wall-clock time per move, a histogram of the
+	share of the expansions used, for players that search with game_search
+	their search statistics (see search_summary()) and, if it was measured,
+	their memory use (see memory_summary())."""
+	names = sorted(set([r["name"] for r in records]))
+	lines = []
+	width = max([len(name) for name in names] + [0])
+	for name in names:
+		mine = [r for r in records if r["name"] == name]
+		times = [r["wall"] for r in mine]
+		lines.append("%-*s %5d moves, %s, CPU %.3fs" % (width, name,
+				len(mine), ", ".join(["p%d %.1fms" % (p, percentile(times, p)
+											* 1000) for p in PERCENTILES]),
+				sum([r["cpu"] for r in mine])))
+		lines.append("%-*s expansions used (%d%% bins): %s" % (width, "",
+				100 // USAGE_BINS, " ".join([str(n) \
+											for n in usage_histogram(mine)])))
+		search = search_summary(mine)
+		if search is not None:
+			lines.append("%-*s search: %s" % (width, "", search))
+		memory = memory_summary(mine)
+		if memory is not None:
+			lines.append("%-*s memory: %s" % (width, "", memory))
+	return lines
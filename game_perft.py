@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+
+import json
+import optparse
+import os
+import sys
+import time
+
+import game
+
+USAGE_STRING = \
+"\nUsage 1: %prog [-m METHOD] [-p MOVES] [--divide] GAME DEPTH\n"\
+"Usage 2: %prog -c [-d DEPTH] [-m METHOD] [GAME ...]\n"\
+"Usage 3: %prog -w [-d DEPTH] GAME\n\n"\
+"Counts the positions DEPTH plies from a position of GAME (perft), to check\n"\
+"and time its move generation.  With -c, checks the counts stored in\n"\
+"perft_counts.json for each GAME (default: every game in the file) and\n"\
+"exits with status 1 if any are wrong; with -w, works them out again for\n"\
+"GAME's positions there, up to DEPTH plies, and stores them."
+
+# The known-good counts: for each game, a list of positions, each with a
+# name, the moves leading to it from the opening (each the index of the move
+# in successor_moves()) and its counts at depths 0, 1, 2, ...
+COUNTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+							"perft_counts.json")
+
+# Ways of walking the game tree, each timing a different part of GameState:
+#   push -- successor_moves(), push_move() and pop_move() (the searches' way)
+#   move -- successor_moves(), make_copy() and move()
+#   move_copy -- successor_moves() and move_copy()
+#   successors -- successors()
+#   successor_moves -- like push, but one ply from the end just counts the
+#     moves from successor_moves() without making them
+METHODS = ["push", "move", "move_copy", "successors", "successor_moves"]
+
+# Positions where someone has won have no moves, so add nothing to the counts
+# at greater depths.  Repeated positions are not checked for.
+
+def perft_push(state, depth):
+	if depth == 0:
+		return 1
+	if state.winner() is not None:
+		return 0
+	n = 0
+	for move in state.successor_moves():
+		state.push_move(move)
+		n += perft_push(state, depth - 1)
+		state.pop_move()
+	return n
+
+def perft_move(state, depth):
+	if depth == 0:
+		return 1
+	if state.winner() is not None:
+		return 0
+	n = 0
+	for move in state.successor_moves():
+		child = state.make_copy()
+		child.move(move)
+		n += perft_move(child, depth - 1)
+	return n
+
+def perft_move_copy(state, depth):
+	if depth == 0:
+		return 1
+	if state.winner() is not None:
+		return 0
+	n = 0
+	for move in state.successor_moves():
+		n += perft_move_copy(state.move_copy(move)[1], depth - 1)
+	return n
+
+def perft_successors(state, depth):
+	if depth == 0:
+		return 1
+	if state.winner() is not None:
+		return 0
+	n = 0
+	for successor in state.successors():
+		n += perft_successors(successor.state, depth - 1)
+	return n
+
+def perft_successor_moves(state, depth):
+	if depth == 0:
+		return 1
+	if state.winner() is not None:
+		return 0
+	moves = state.successor_moves()
+	if depth == 1:
+		return len(moves)
+	n = 0
+	for move in moves:
+		state.push_move(move)
+		n += perft_successor_moves(state, depth - 1)
+		state.pop_move()
+	return n
+
+PERFT = {"push": perft_push, "move": perft_move,
+		"move_copy": perft_move_copy, "successors": perft_successors,
+		"successor_moves": perft_successor_moves}
+
+def perft(state, depth, method="push"):
+	"""Returns the number of positions "depth" plies from "state", counting
+	them the way "method" (one of METHODS) says.  The state is left as it
+	was found, and should have no move counter, so every expansion is
+	allowed."""
+	return PERFT[method](state, depth)
+
+def divide(state, depth, method="push"):
+	"""Returns a list of 2-tuples (move, count) giving the number of
+	positions "depth" plies from "state" below each of its moves."""
+	if depth == 0 or state.winner() is not None:
+		return []
+	return [(move, perft(state.move_copy(move)[1], depth - 1, method)) \
+				for move in state.successor_moves()]
+
+def load_state(gameName, moves=()):
+	"""Returns a new state of the named game, after the indicated moves
+	(indices in successor_moves()) from the opening."""
+	gameMod = game.load_module(gameName.lower(), None, os.getcwd())
+	if gameMod == None:
+		sys.exit(2)
+	state = game.call_name(gameMod, "make_state")
+	for k in moves:
+		state.move(state.successor_moves()[k])
+	return state
+
+def load_counts():
+	f = open(COUNTS_FILE)
+	try:
+		return json.load(f)
+	finally:
+		f.close()
+
+def timed_perft(state, depth, method):
+	"""Returns a 2-tuple (count, seconds) for perft()."""
+	start = time.time()
+	n = perft(state, depth, method)
+	return (n, time.time() - start)
+
+def rate(n, seconds):
+	return "%d nodes/s" % (n / seconds) if seconds > 0 else "-"
+
+def check(gameNames, maxDepth, method):
+	"""Checks the stored counts of the named games (all of them if
+	"gameNames" is empty), to at most "maxDepth" plies (None for all of
+	them), printing each result and the speed.  Returns True if they are
+	all right."""
+	counts = load_counts()
+	ok = True
+	for gameName in gameNames or sorted(counts):
+		for position in counts[gameName]:
+			state = load_state(gameName, position["moves"])
+			expected = position["counts"]
+			if maxDepth is not None:
+				expected = expected[:maxDepth + 1]
+			total = 0
+			seconds = 0.0
+			for depth, count in enumerate(expected):
+				n, t = timed_perft(state, depth, method)
+				total += n
+				seconds += t
+				if n != count:
+					print "%s %s: depth %d gave %d, expected %d" \
+							% (gameName, position["name"], depth, n, count)
+					ok = False
+			print "%s %s: depths 0-%d checked, %s" % (gameName,
+					position["name"], len(expected) - 1, rate(total, seconds))
+	return ok
+
+def write_counts(gameName, maxDepth):
+	"""Works out the counts of the named game's stored positions again, to
+	"maxDepth" plies, and saves them."""
+	counts = load_counts()
+	for position in counts[gameName]:
+		state = load_state(gameName, position["moves"])
+		position["counts"] = [perft(state, depth) \
+								for depth in range(maxDepth + 1)]
+		print "%s %s: %s" % (gameName, position["name"], position["counts"])
+	# One line per position, to keep diffs of the file readable
+	games = ['"%s": [\n%s\n ]' % (name, ",\n".join(["  " \
+				+ json.dumps(position, sort_keys=True) \
+				for position in counts[name]])) for name in sorted(counts)]
+	f = open(COUNTS_FILE, "w")
+	try:
+		f.write("{\n %s\n}\n" % ",\n ".join(games))
+	finally:
+		f.close()
+
+def main():
+	parser = optparse.OptionParser()
+	parser.set_usage(USAGE_STRING)
+	parser.add_option("-m", "--method", type="choice", choices=METHODS,
+		dest="method", help="How to walk the game tree: %s (default=push)" \
+			% ", ".join(METHODS), metavar="METHOD")
+	parser.add_option("-p", "--position", dest="position",
+		help="Start after MOVES, a comma-separated list of indices in "\
+		"successor_moves(), instead of at the opening.", metavar="MOVES")
+	parser.add_option("--divide", action="store_true", dest="divide",
+		help="Give the count below each move separately.")
+	parser.add_option("-c", "--check", action="store_true", dest="check",
+		help="Check the stored counts.")
+	parser.add_option("-w", "--write", action="store_true", dest="write",
+		help="Work out the stored counts again and save them.")
+	parser.add_option("-d", "--depth", type="int", dest="depth",
+		help="Check or write the stored counts only to DEPTH plies.",
+		metavar="DEPTH")
+	parser.set_defaults(method="push", divide=False, check=False, write=False)
+	opts, args = parser.parse_args()
+
+	if opts.check:
+		if not check(args, opts.depth, opts.method):
+			sys.exit(1)
+		return
+	if opts.write:
+		if len(args) != 1 or opts.depth is None:
+			print "Error: Writing counts requires 1 argument and -d.  "\
+					"Use '-h' for more information."
+			sys.exit(1)
+		write_counts(args[0], opts.depth)
+		return
+	if len(args) != 2:
+		print "Error: Perft requires 2 arguments.  "\
+				"Use '-h' for more information."
+		sys.exit(1)
+	moves = []
+	if opts.position:
+		moves = [int(k) for k in opts.position.split(",")]
+	state = load_state(args[0], moves)
+	depth = int(args[1])
+	if opts.divide:
+		start = time.time()
+		total = 0
+		for move, n in divide(state, depth, opts.method):
+			print "%s: %d" % (move, n)
+			total += n
+		seconds = time.time() - start
+	else:
+		total, seconds = timed_perft(state, depth, opts.method)
+	print "Nodes: %d in %.3f seconds, %s" % (total, seconds,
+											rate(total, seconds))
+
+if __name__ == "__main__":
+	main()
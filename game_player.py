@@ -1,3 +1,10 @@
+import time
+
+import game_search
+
+# game_transposition and game_smp (which bring in multiprocessing) are
+# imported by SearchPlayer only when it's used, so players that don't search
+# with it don't load them
 
 class GamePlayer(object):
 	"""Represents/contains the logic for an individual player in a game
@@ -8,6 +15,10 @@ class GamePlayer(object):
 	  minimax_move()
 	  alpha_beta_move()
 	  tournament_move()"""
+	
+	# The part of the remaining time iterative_deepening_move() spends
+	# searching when the controller sets a time limit
+	TIME_SAFETY = 0.9
 	  
 	def __init__(self, name, game_id):
 		""""name" is a string identifier for the player (the default game framework
@@ -17,6 +28,8 @@ class GamePlayer(object):
 		player 1)"""
 		self.name = name
 		self.game_id = game_id
+		# Filled in by the searches of the current move
+		self.stats = game_search.SearchStats()
 		
 	def get_name(self):
 		return self.name
@@ -24,6 +37,13 @@ class GamePlayer(object):
 	def get_game_id(self):
 		return self.game_id
 	
+	def get_stats(self):
+		"""Returns the player's game_search.SearchStats, which the
+		controller clears before each move and reads after it.  A player
+		with a search of its own can pass it to the searches in game_search,
+		or fill it in itself."""
+		return self.stats
+	
 	def evaluate(self, state):
 		"""Override in subclass!
 		
@@ -55,4 +75,182 @@ class GamePlayer(object):
 		
 		Calls minimax_move() or alpha_beta_move().  Or, performs special behavior 
 		if you like."""
-		pass
\ No newline at end of file
+		pass
+	
+	def seed(self, seed):
+		"""Override in subclass!
+		
+		Reseeds whatever random choices the player makes, so that a game can
+		be played again exactly (e.g., gobblet_selfplay gives each game its
+		own seed)."""
+		pass
+	
+	def iterative_deepening_move(self, state, deadline=None, table=None,
+								evaluate_children=None,
+								method=game_search.ALPHA_BETA):
+		"""A ready-made search for the move functions: searches deeper and
+		deeper with alpha-beta (or the search "method" selects), scoring
+		positions with evaluate(), until the turn's expansions or the
+		deadline run out (see game_search.iterative_deepening()), and
+		returns the best move of the deepest search that finished.
+		
+		Instead of guessing a horizon to fit the expansions allowed, this
+		uses them all and returns the move of a complete search, or, if not
+		even a one-ply search finished, fallback_move().
+		
+		"state" is an object whose type is a game-specific subclass of
+		  GameState.  It is searched in place with push_move() and pop_move()
+		  and left as it was found.
+		"deadline" is an optional time.time() value to stop searching by.  If
+		  it isn't given and the controller has set a time limit (see
+		  GameState.time_remaining()), the search stops a little before the
+		  limit, leaving time to hand the move back.
+		"table" is an optional game_transposition.TranspositionTable.
+		"evaluate_children" is an optional batch version of evaluate(), see
+		  game_search.alpha_beta_search()."""
+		if deadline is None:
+			deadline = self.search_deadline(state)
+		move = game_search.iterative_deepening(state, self.evaluate,
+												deadline, None, table,
+												evaluate_children, method, 1,
+												self.stats)[1]
+		if move is None:
+			move = self.fallback_move(state, table)
+		return move
+	
+	def fallback_move(self, state, table=None):
+		"""Returns a move to make when no search finished: the best move
+		"table" (a game_transposition.TranspositionTable) holds for "state",
+		if any, or else the first legal move, or None if there are no moves.
+		Lists the moves even if the turn's expansions have run out, as a
+		legal move is better than forfeiting."""
+		if table is not None and state.repeats():
+			entry = table.probe(state.repeated_rep())
+			if entry is not None and entry[3] is not None \
+					and state.is_valid_move(entry[3]):
+				return entry[3]
+		counter = state.moveCounter
+		state.set_counter(None)
+		try:
+			moves = state.successor_moves()
+		finally:
+			state.set_counter(counter)
+		if not moves:
+			return None
+		return moves[0]
+
+	def search_deadline(self, state):
+		"""Returns the time.time() value by which a search should stop to
+		leave time to hand the move back, or None if the controller has set
+		no time limit."""
+		remaining = state.time_remaining()
+		if remaining is None:
+			return None
+		return time.time() + remaining * GamePlayer.TIME_SAFETY
+
+class SearchPlayer(GamePlayer):
+	"""A GamePlayer whose move functions are ready-made, using the searches
+	in game_search, so that a subclass need only override evaluate() (which
+	scores a state from the first player's point of view, and must not hold
+	on to the state; see game_search).
+	  minimax_move() -- iterative-deepening minimax
+	  alpha_beta_move() -- iterative-deepening principal-variation search,
+	    with a transposition table kept from move to move if the game's
+	    states can be told apart by repeated_rep()
+	  tournament_move() -- calls alpha_beta_move()
+	Each searches as deep as the turn's expansions (and time limit, if any)
+	allow.  The state is searched in place, so evaluate() must return
+	integers and be the same function from move to move.
+	
+	A subclass which overrides encode_move() and decode_move() and sets
+	MOVE_CODES keeps its table in compact arrays, which hold many times more
+	entries in the same memory, if repeated_rep() gives 64-bit integer keys.
+	If it also sets HELPERS above 0, it searches with that many helper
+	processes (see game_smp) in alpha_beta_move().  One which overrides
+	evaluate_children() and sets BATCH_EVALUATE scores the leaves under each
+	position one ply from the horizon together."""
+	
+	# Memory budget of the transposition table, in bytes
+	TABLE_BYTES = 4 * 1024 * 1024
+	# Set when encode_move() and decode_move() are overridden
+	MOVE_CODES = False
+	# Helper processes for alpha_beta_move(), if MOVE_CODES is set
+	HELPERS = 0
+	# Set when evaluate_children() is overridden
+	BATCH_EVALUATE = False
+	
+	def __init__(self, name, game_id):
+		import game_transposition
+		GamePlayer.__init__(self, name, game_id)
+		if self.MOVE_CODES:
+			self.table = game_transposition.TranspositionTable( \
+								SearchPlayer.TABLE_BYTES,
+								encode_move=self.encode_move,
+								decode_move=self.decode_move)
+		else:
+			self.table = game_transposition.TranspositionTable( \
+								SearchPlayer.TABLE_BYTES)
+		# Made when first needed, with a shared table of its own
+		self.smp = None
+	
+	def encode_move(self, move):
+		"""Override in subclass!
+		
+		Returns an integer from 0 to 65534 standing for a move.  Needed only
+		with MOVE_CODES."""
+		pass
+	
+	def decode_move(self, code):
+		"""Override in subclass!
+		
+		The reverse of encode_move().  Needed only with MOVE_CODES."""
+		pass
+	
+	def evaluate_children(self, state, moves):
+		"""Override in subclass!
+		
+		Returns the list of the evaluate() values of the states each of
+		"moves" leads to from "state", wins scored as in game_search (see
+		game_search.alpha_beta_search()).  Needed only with BATCH_EVALUATE."""
+		pass
+	
+	def batch_evaluate(self):
+		"""Returns the "evaluate_children" function to search with: the
+		evaluate_children() method if BATCH_EVALUATE is set, or None."""
+		if self.BATCH_EVALUATE:
+			return self.evaluate_children
+		return None
+	
+	def minimax_move(self, state, visited):
+		"""Searches with minimax, deeper and deeper."""
+		return self.iterative_deepening_move(state,
+							evaluate_children=self.batch_evaluate(),
+							method=game_search.MINIMAX)
+	
+	def alpha_beta_move(self, state, visited):
+		"""Searches with principal-variation search, deeper and deeper."""
+		table = None
+		if state.repeats() and self.MOVE_CODES and self.HELPERS > 0:
+			if self.smp is None:
+				import game_smp
+				import game_transposition
+				self.smp = game_smp.LazySMP(self.evaluate, self.HELPERS,
+							game_transposition.SharedTranspositionTable( \
+								SearchPlayer.TABLE_BYTES, self.encode_move,
+								self.decode_move),
+							evaluate_children=self.batch_evaluate())
+			move = self.smp.search(state, self.search_deadline(state),
+									self.stats)[1]
+			if move is None:
+				move = self.fallback_move(state, self.smp.table)
+			return move
+		if state.repeats():
+			table = self.table
+			table.new_search()
+		return self.iterative_deepening_move(state, table=table,
+							evaluate_children=self.batch_evaluate(),
+							method=game_search.PVS)
+	
+	def tournament_move(self, state, visited):
+		"""Calls alpha_beta_move()."""
+		return self.alpha_beta_move(state, visited)
\ No newline at end of file
@@ -0,0 +1,274 @@
+import cProfile
+import os
+import signal
+import sys
+
+# Profilers for the GameController (see its "profiler" argument), which
+# profile each player's moves apart from each other and from the controller's
+# own work, keyed by label: the player's name, or CONTROLLER.  Time is split
+# up by call site into CATEGORIES, by the name of the function it was spent
+# under (the innermost one with one of the names listed).  Both write a
+# collapsed-stack file, one "frame;frame;... count" line per stack, which
+# flamegraph.pl and speedscope read.
+
+CONTROLLER = "controller"
+
+EVALUATION = "evaluation"
+MOVE_GENERATION = "move generation"
+OTHER = "search and other"
+CATEGORIES = [EVALUATION, MOVE_GENERATION, OTHER]
+
+# Function names counted as each category
+CATEGORY_NAMES = {}
+for name in ["evaluate", "evaluate_children", "evaluate_boards"]:
+	CATEGORY_NAMES[name] = EVALUATION
+for name in ["successors", "iter_successors", "successor_moves",
+			"iter_successor_moves", "successor_cells", "successor_numbers",
+			"move_numbers", "generate_moves", "generate_cells", "push_move",
+			"pop_move", "push_cells", "push_number", "move", "move_copy",
+			"make_copy", "copy_into", "is_valid_move"]:
+	CATEGORY_NAMES[name] = MOVE_GENERATION
+
+# Seconds of CPU time between samples of a SamplingProfiler
+SAMPLE_INTERVAL = 0.005
+
+# Stacks of a CallProfiler's collapsed-stack file carrying less time than
+# this, in seconds, are left out
+MIN_STACK_TIME = 1e-5
+
+def frame_name(filename, name):
+	"""Returns the name of a stack frame in a collapsed-stack file: the
+	module and the function."""
+	module = os.path.splitext(os.path.basename(filename))[0]
+	if module in ("", "~"):
+		return name
+	return "%s:%s" % (module, name)
+
+class Profiler(object):
+	"""The interface the GameController uses.  Intended to be subclassed."""
+
+	def start(self):
+		"""Starts profiling the controller, as it starts a game."""
+		pass
+
+	def stop(self):
+		"""Stops profiling, as the game ends."""
+		pass
+
+	def call(self, label, fn, *args):
+		"""Calls fn(*args) for the player "label", profiling it apart from
+		the controller, and returns what it returns."""
+		return fn(*args)
+
+	def times(self):
+		"""Returns a dictionary mapping each label to a 2-tuple (seconds,
+		categories): the time profiled, and a dictionary mapping each of
+		CATEGORIES to the seconds of it spent there."""
+		return {}
+
+	def collapsed_stacks(self):
+		"""Returns a dictionary mapping collapsed stacks (frame names joined
+		with ";", the label first) to their counts."""
+		return {}
+
+	def save(self, prefix):
+		"""Writes the results to files whose names start with "prefix", and
+		returns the list of their names."""
+		fname = prefix + ".collapsed"
+		f = open(fname, "w")
+		try:
+			for stack, count in sorted(self.collapsed_stacks().items()):
+				if count > 0:
+					f.write("%s %d\n" % (stack, count))
+		finally:
+			f.close()
+		return [fname]
+
+	def summarize(self):
+		"""Returns a list of lines giving each label's time, and the share of
+		it in each category."""
+		times = self.times()
+		width = max([len(label) for label in times] + [0])
+		lines = []
+		for label in sorted(times):
+			seconds, categories = times[label]
+			parts = ["%s %.0f%%" % (c, 100.0 * categories[c] / seconds) \
+						for c in CATEGORIES if seconds > 0 and categories[c] > 0]
+			lines.append("%-*s %9.3fs  %s" % (width, label, seconds,
+											", ".join(parts)))
+		return lines
+
+class CallProfiler(Profiler):
+	"""Profiles with cProfile, which times every call.  Accurate, but slows
+	the players down severalfold, so best kept to a few games.
+
+	Besides the collapsed stacks, save() writes a pstats file for each
+	label.  cProfile keeps no stacks, only who called whom, so the stacks
+	are built from its call graph, sharing out each function's time among
+	its callees as it was shared out over all its calls; counts are
+	microseconds."""
+
+	def __init__(self):
+		self.profiles = {CONTROLLER: cProfile.Profile()}
+		self.running = False
+
+	def profile(self, label):
+		if label not in self.profiles:
+			self.profiles[label] = cProfile.Profile()
+		return self.profiles[label]
+
+	def start(self):
+		self.running = True
+		self.profiles[CONTROLLER].enable()
+
+	def stop(self):
+		self.profiles[CONTROLLER].disable()
+		self.running = False
+
+	def call(self, label, fn, *args):
+		# Only one profile can be enabled at a time
+		if self.running:
+			self.profiles[CONTROLLER].disable()
+		profile = self.profile(label)
+		profile.enable()
+		try:
+			return fn(*args)
+		finally:
+			profile.disable()
+			if self.running:
+				self.profiles[CONTROLLER].enable()
+
+	def stats(self, label):
+		"""Returns the pstats-style dictionary of a label's profile."""
+		profile = self.profiles[label]
+		profile.create_stats()
+		return profile.stats
+
+	def times(self):
+		result = {}
+		for label in self.profiles:
+			stats = self.stats(label)
+			categories = dict([(c, 0.0) for c in CATEGORIES])
+			total = 0.0
+			for func, (cc, nc, tt, ct, callers) in stats.items():
+				total += tt
+				category = CATEGORY_NAMES.get(func[2])
+				if category is None:
+					continue
+				# Time under the function, except where it was called from
+				# within its own category (already counted there)
+				if not callers:
+					categories[category] += ct
+				for caller, edge in callers.items():
+					if CATEGORY_NAMES.get(caller[2]) != category:
+						categories[category] += edge[3]
+			categories[OTHER] = max(total - categories[EVALUATION] \
+									- categories[MOVE_GENERATION], 0.0)
+			result[label] = (total, categories)
+		return result
+
+	def collapsed_stacks(self):
+		counts = {}
+		for label in self.profiles:
+			stats = self.stats(label)
+			children = {}
+			for func, (cc, nc, tt, ct, callers) in stats.items():
+				for caller, edge in callers.items():
+					children.setdefault(caller, []).append((func, edge[3]))
+			roots = [func for func, value in stats.items() if not value[4]]
+			for func in roots:
+				self.walk(stats, children, [label], [], func, stats[func][3],
+							counts)
+		return counts
+
+	def walk(self, stats, children, path, funcs, func, seconds, counts):
+		"""Adds the stacks below "func", reached along "path" with "seconds"
+		spent under it, to "counts".  Recursive calls are folded into the
+		outermost one."""
+		if seconds < MIN_STACK_TIME or func in funcs:
+			return
+		cc, nc, tt, ct, callers = stats[func]
+		if ct <= 0:
+			return
+		share = min(seconds / ct, 1.0)
+		path = path + [frame_name(func[0], func[2])]
+		funcs = funcs + [func]
+		stack = ";".join(path)
+		counts[stack] = counts.get(stack, 0) + int(tt * share * 1e6)
+		for child, t in children.get(func, []):
+			self.walk(stats, children, path, funcs, child, t * share, counts)
+
+	def save(self, prefix):
+		fnames = Profiler.save(self, prefix)
+		for label in sorted(self.profiles):
+			fname = "%s.%s.pstats" % (prefix, label)
+			self.profiles[label].dump_stats(fname)
+			fnames.append(fname)
+		return fnames
+
+class SamplingProfiler(Profiler):
+	"""Profiles by looking at the stack every "interval" seconds of CPU time
+	(with SIGPROF, so Unix only), which costs little enough to leave on for
+	whole tournaments.  Counts in the collapsed stacks are samples."""
+
+	def __init__(self, interval=SAMPLE_INTERVAL):
+		self.interval = interval
+		self.counts = {}
+		self.categories = {}
+		self.label = CONTROLLER
+		# Samples are of the stack above this frame
+		self.base = None
+
+	def start(self):
+		self.label = CONTROLLER
+		self.base = sys._getframe(1)
+		signal.signal(signal.SIGPROF, self.sample)
+		# Let system calls carry on after a sample instead of failing
+		signal.siginterrupt(signal.SIGPROF, False)
+		signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+	def stop(self):
+		signal.setitimer(signal.ITIMER_PROF, 0, 0)
+		signal.signal(signal.SIGPROF, signal.SIG_DFL)
+		self.base = None
+
+	def call(self, label, fn, *args):
+		saved = (self.label, self.base)
+		self.label = label
+		self.base = sys._getframe()
+		try:
+			return fn(*args)
+		finally:
+			self.label, self.base = saved
+
+	def sample(self, signum, frame):
+		"""The SIGPROF handler."""
+		names = []
+		category = None
+		while frame is not None and frame is not self.base:
+			code = frame.f_code
+			if category is None:
+				category = CATEGORY_NAMES.get(code.co_name)
+			names.append(frame_name(code.co_filename, code.co_name))
+			frame = frame.f_back
+		if self.label == CONTROLLER and self.base is not None:
+			code = self.base.f_code
+			names.append(frame_name(code.co_filename, code.co_name))
+		names.append(self.label)
+		names.reverse()
+		stack = ";".join(names)
+		self.counts[stack] = self.counts.get(stack, 0) + 1
+		categories = self.categories.setdefault(self.label,
+								dict([(c, 0) for c in CATEGORIES]))
+		categories[category or OTHER] += 1
+
+	def times(self):
+		result = {}
+		for label, categories in self.categories.items():
+			result[label] = (sum(categories.values()) * self.interval,
+							dict([(c, n * self.interval) \
+								for c, n in categories.items()]))
+		return result
+
+	def collapsed_stacks(self):
+		return self.counts
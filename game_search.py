@@ -0,0 +1,486 @@
+import itertools
+import sys
+import time
+
+# Search helpers usable with any GameState subclass.  Rather than asking for
+# successors(), which copies the state once per child, these walk the game
+# tree on the one state they are given, making each move with push_move() and
+# taking it back with pop_move().  The state is left as it was found.
+#
+# As in the example players, the first player returned by get_players() is
+# MAX and the second is MIN, and "evaluate" is a function taking a state and
+# returning its value from MAX's point of view.  Since the state keeps
+# changing under it, "evaluate" must not hold on to the state it is given.
+#
+# The negamax searches (negamax_search(), pvs_search()) score positions for
+# the player to move internally, so one loop serves both players, but take
+# and return values from MAX's point of view like the others, so any of the
+# searches can be used in place of any other.
+
+# A deadline that never passes, for searches limited only by expansions
+NO_DEADLINE = float("inf")
+
+# The value of a won position for the winner in the negamax searches
+WIN = sys.maxint
+
+# Search methods for iterative_deepening()
+MINIMAX = 0
+ALPHA_BETA = 1
+NEGAMAX = 2
+PVS = 3
+
+class SearchTimeout(Exception):
+	"""Raised by a search given a deadline when the deadline passes or the
+	expansions run out before it is done, so the search can be abandoned
+	instead of returning a value from a partly-searched tree."""
+	pass
+
+class SearchStats(object):
+	"""Counts what the searches here do, for comparing how well they prune.
+	Any of the searches can be given one to fill in (see GamePlayer's
+	get_stats()); it adds up over all the searches made until cleared.
+	  nodes -- positions visited, leaves included
+	  leaves -- positions scored with the evaluation function
+	  cutoffs -- positions whose search stopped early on a cutoff
+	  firstCutoffs -- those where the cutoff came on the first move tried
+	  tableProbes, tableHits -- transposition table lookups, and those that
+	    gave a value without searching
+	  depth -- the most plies below the position first visited that any
+	    search reached"""
+
+	# The counts, as named by as_dict()
+	FIELDS = ["nodes", "leaves", "cutoffs", "first_cutoffs", "table_probes",
+				"table_hits", "depth"]
+
+	def __init__(self):
+		self.clear()
+
+	def clear(self):
+		self.nodes = 0
+		self.leaves = 0
+		self.cutoffs = 0
+		self.firstCutoffs = 0
+		self.tableProbes = 0
+		self.tableHits = 0
+		self.depth = 0
+		# Length of the moveStack of the first position visited
+		self.base = None
+
+	def visit(self, state):
+		"""Counts a visit to "state"."""
+		self.nodes += 1
+		self.reach(state, 0)
+
+	def visit_children(self, state, n):
+		"""Counts visits to n children of "state", made without moving to
+		them (e.g., scored together by "evaluate_children")."""
+		self.nodes += n
+		self.reach(state, 1)
+
+	def reach(self, state, below):
+		"""Records that a search reached "below" plies under "state"."""
+		if self.base is None:
+			self.base = len(state.moveStack)
+		depth = len(state.moveStack) - self.base + below
+		if depth > self.depth:
+			self.depth = depth
+
+	def add(self, other):
+		"""Adds the counts of another SearchStats to these; the depth is the
+		greater of the two."""
+		self.nodes += other.nodes
+		self.leaves += other.leaves
+		self.cutoffs += other.cutoffs
+		self.firstCutoffs += other.firstCutoffs
+		self.tableProbes += other.tableProbes
+		self.tableHits += other.tableHits
+		self.depth = max(self.depth, other.depth)
+
+	def first_cutoff_rate(self):
+		"""Returns the share of the cutoffs that came on the first move tried
+		(near 1 when the moves are well ordered), or None if there were
+		none."""
+		if self.cutoffs == 0:
+			return None
+		return float(self.firstCutoffs) / self.cutoffs
+
+	def branching_factor(self):
+		"""Returns the effective branching factor, the depth-th root of the
+		nodes visited, or None if no search went below its first position.
+		Iterative deepening visits the shallow positions again, so this is a
+		little high for it; it's meant for comparing searches, not games."""
+		if self.depth == 0:
+			return None
+		return self.nodes ** (1.0 / self.depth)
+
+	def as_dict(self):
+		"""Returns the counts as a dictionary whose keys are FIELDS."""
+		return {"nodes": self.nodes, "leaves": self.leaves,
+				"cutoffs": self.cutoffs, "first_cutoffs": self.firstCutoffs,
+				"table_probes": self.tableProbes,
+				"table_hits": self.tableHits, "depth": self.depth}
+
+def terminal_checks(state, h, evaluate, deadline=None, stats=None):
+	"""Does most of the terminal checks for a single step in the search.
+
+	"h" is the number of steps to the ply horizon
+	"deadline" is an optional time.time() value; if given, running out of
+	  time or of expansions before the horizon raises SearchTimeout
+	"stats" is an optional SearchStats, which counts the evaluation
+
+	Returns None if no termination, (value, move) otherwise"""
+	winner = state.winner()
+	if winner is not None:
+		# If first player wins, that's a positive
+		if winner == state.get_players()[0]:
+			return (sys.maxint, None)
+		# If second player wins, that's a negative
+		return (-sys.maxint-1, None)
+
+	check_deadline(state, h, deadline)
+
+	# If there are no more expansions allowed, or if
+	# we hit the horizon, evaluate
+	if state.expansions_count() <= 0 or h <= 0:
+		if stats is not None:
+			stats.leaves += 1
+		return (evaluate(state), None)
+
+	# if no termination, return None
+	return None
+
+def check_deadline(state, h, deadline):
+	"""Raises SearchTimeout if there's a deadline and it has passed, or the
+	expansions have run out with "h" plies still to search."""
+	if deadline is not None and (time.time() >= deadline \
+			or (h > 0 and state.expansions_count() <= 0)):
+		raise SearchTimeout()
+
+def minimax_search(state, h, evaluate, deadline=None, evaluate_children=None,
+					stats=None):
+	"""Searches "h" plies ahead of "state" with minimax.
+
+	"deadline" is as for terminal_checks().
+	"evaluate_children" is as for alpha_beta_search().
+	"stats" is an optional SearchStats to count the search in.
+
+	Returns a (value, move) tuple, move being the best move for the player
+	to move in "state" (None if the search stopped at "state")."""
+	if stats is not None:
+		stats.visit(state)
+	term = terminal_checks(state, h, evaluate, deadline, stats)
+	if term != None:
+		return term
+
+	# We just checked expansions_count(), so we're allowed these moves
+	moves = state.successor_moves()
+	# Unless another process took the last of a shared budget meanwhile
+	if moves is None:
+		raise SearchTimeout()
+	# If there are no successors and nobody's won, it's a draw
+	if len(moves) == 0:
+		return (0, None)
+
+	values = None
+	if h == 1 and evaluate_children is not None:
+		values = evaluate_children(state, moves)
+		if stats is not None:
+			stats.visit_children(state, len(moves))
+			stats.leaves += len(moves)
+
+	maxing = state.get_next_player() == state.get_players()[0]
+	best = None
+	for k, m in enumerate(moves):
+		if values is not None:
+			v = values[k]
+		else:
+			state.push_move(m)
+			v = minimax_search(state, h-1, evaluate, deadline,
+								evaluate_children, stats)[0]
+			state.pop_move()
+		if best is None or (maxing and v > best[0]) \
+				or (not maxing and v < best[0]):
+			best = (v, m)
+	return best
+
+def alpha_beta_search(state, h, a, b, evaluate, table=None, deadline=None,
+						first=None, evaluate_children=None, stats=None):
+	"""Does the same thing as minimax_search() but with alpha-beta pruning.
+
+	"a", "b" are the alpha and beta values.
+	"table" is an optional game_transposition.TranspositionTable, keyed by
+	  the states' repeated_rep(), used to skip positions already searched
+	  deeply enough and to try their best moves first.
+	"deadline" is as for terminal_checks().  If SearchTimeout is raised, the
+	  moves the search was in the middle of are left on the state's
+	  moveStack; see iterative_deepening().
+	"first" is an optional move to search first at the top of the tree
+	  (e.g., the best move found by a shallower search).
+	"evaluate_children" is an optional function taking a state and a list
+	  of its moves and returning a list of the values of the states they
+	  lead to, as terminal_checks() would score them at the horizon (wins
+	  included).  One ply from the horizon, it scores all the leaves at
+	  once instead of making each move and calling "evaluate" (see, e.g.,
+	  gobblet_eval.evaluate_children()).
+	"stats" is an optional SearchStats to count the search in."""
+	if stats is not None:
+		stats.visit(state)
+	term = terminal_checks(state, h, evaluate, deadline, stats)
+	if term != None:
+		return term
+
+	key = None
+	if table is not None:
+		key = state.repeated_rep()
+		value, move = table.lookup(key, h, a, b)
+		if stats is not None:
+			stats.tableProbes += 1
+			if value is not None:
+				stats.tableHits += 1
+		if value is not None:
+			return (value, move)
+		if first is None:
+			first = move
+
+	# We just checked expansions_count(), so we're allowed these moves.  They
+	# are generated as we go, so a cutoff skips making the rest.
+	moves = state.iter_successor_moves()
+	if moves is None:
+		raise SearchTimeout()
+	# The table's best move gets searched first
+	if first is not None and state.is_valid_move(first):
+		moves = itertools.chain([first], (x for x in moves if x != first))
+	# Just above the horizon, the children are all leaves: score them together
+	values = None
+	if h == 1 and evaluate_children is not None:
+		moves = list(moves)
+		values = evaluate_children(state, moves)
+		if stats is not None and moves:
+			stats.visit_children(state, len(moves))
+			stats.leaves += len(moves)
+
+	maxing = state.get_next_player() == state.get_players()[0]
+	a0, b0 = a, b
+	# We start out with the worst possible value and no move
+	v = -sys.maxint-1 if maxing else sys.maxint
+	m = None
+	for k, move in enumerate(moves):
+		if values is not None:
+			s_val = values[k]
+		else:
+			state.push_move(move)
+			s_val = alpha_beta_search(state, h-1, a, b, evaluate, table,
+									deadline, None, evaluate_children,
+									stats)[0]
+			state.pop_move()
+		# If our new value is better than our best value, update the best
+		#  value and the best move
+		if m is None or (maxing and s_val > v) \
+				or (not maxing and s_val < v):
+			v = s_val
+			m = move
+		# If we're maxing and exceeding the min above, we're done
+		# Likewise if we're minning and exceeding the max above
+		if (maxing and v >= b) or (not maxing and v <= a):
+			if stats is not None:
+				stats.cutoffs += 1
+				if k == 0:
+					stats.firstCutoffs += 1
+			break
+		# Update a,b for the next move
+		if maxing:
+			a = max(a, v)
+		else:
+			b = min(b, v)
+	# If there are no successors and nobody's won, it's a draw
+	if m is None:
+		return (0, None)
+	if table is not None:
+		table.record(key, h, v, a0, b0, m)
+	# return the best value, move we found
+	return (v, m)
+
+def negamax_terminal(state, h, evaluate, deadline, stats=None):
+	"""Like terminal_checks(), but values are for the player to move."""
+	winner = state.winner()
+	if winner is not None:
+		return (WIN if winner == state.get_next_player() else -WIN, None)
+
+	check_deadline(state, h, deadline)
+
+	if state.expansions_count() <= 0 or h <= 0:
+		if stats is not None:
+			stats.leaves += 1
+		v = evaluate(state)
+		if state.get_next_player() != state.get_players()[0]:
+			v = -v
+		return (v, None)
+	return None
+
+def negamax(state, h, a, b, evaluate, table, deadline, first,
+			evaluate_children, scout, stats=None):
+	"""The negamax alpha-beta search behind negamax_search() and
+	pvs_search().  Values, including "a" and "b", are for the player to move
+	in "state".  It fails soft: when the true value is outside the window
+	(a, b), the value returned is a tighter bound on it than a or b.
+
+	With "scout" set, every move after the first is searched with a null
+	window, just to prove it is no better than the best so far, and only
+	searched again with the full window if it turns out to be better
+	(principal-variation search).  Values must be integers.
+
+	"evaluate_children" scores from the first player's point of view, as
+	for alpha_beta_search(); its values are turned around here."""
+	if stats is not None:
+		stats.visit(state)
+	term = negamax_terminal(state, h, evaluate, deadline, stats)
+	if term != None:
+		return term
+
+	key = None
+	if table is not None:
+		key = state.repeated_rep()
+		value, move = table.lookup(key, h, a, b)
+		if stats is not None:
+			stats.tableProbes += 1
+			if value is not None:
+				stats.tableHits += 1
+		if value is not None:
+			return (value, move)
+		if first is None:
+			first = move
+
+	moves = state.iter_successor_moves()
+	if moves is None:
+		raise SearchTimeout()
+	if first is not None and state.is_valid_move(first):
+		moves = itertools.chain([first], (x for x in moves if x != first))
+	values = None
+	if h == 1 and evaluate_children is not None:
+		moves = list(moves)
+		values = evaluate_children(state, moves)
+		if stats is not None and moves:
+			stats.visit_children(state, len(moves))
+			stats.leaves += len(moves)
+		# As negamax_terminal() would score them, wins as WIN or -WIN
+		sign = 1 if state.get_next_player() == state.get_players()[0] else -1
+		values = [max(-WIN, min(sign * x, WIN)) for x in values]
+
+	a0 = a
+	v = None
+	m = None
+	for k, move in enumerate(moves):
+		if values is not None:
+			s_val = values[k]
+		elif scout and m is not None:
+			state.push_move(move)
+			s_val = -negamax(state, h-1, -a-1, -a, evaluate, table, deadline,
+							None, evaluate_children, scout, stats)[0]
+			if a < s_val < b:
+				s_val = -negamax(state, h-1, -b, -s_val, evaluate, table,
+								deadline, None, evaluate_children, scout,
+								stats)[0]
+			state.pop_move()
+		else:
+			state.push_move(move)
+			s_val = -negamax(state, h-1, -b, -a, evaluate, table, deadline,
+							None, evaluate_children, scout, stats)[0]
+			state.pop_move()
+		if m is None or s_val > v:
+			v = s_val
+			m = move
+		if v > a:
+			a = v
+		if a >= b:
+			if stats is not None:
+				stats.cutoffs += 1
+				if k == 0:
+					stats.firstCutoffs += 1
+			break
+	# If there are no successors and nobody's won, it's a draw
+	if m is None:
+		return (0, None)
+	if table is not None:
+		table.record(key, h, v, a0, b, m)
+	return (v, m)
+
+def negamax_search(state, h, a, b, evaluate, table=None, deadline=None,
+					first=None, evaluate_children=None, scout=False,
+					stats=None):
+	"""Does the same thing as alpha_beta_search(), with a fail-soft negamax
+	search (see negamax()).  A win for the second player is -sys.maxint.
+
+	"table" stores values for the player to move, so don't share one with
+	alpha_beta_search().
+	"scout" selects principal-variation search; see pvs_search()."""
+	if state.get_next_player() == state.get_players()[0]:
+		return negamax(state, h, a, b, evaluate, table, deadline, first,
+						evaluate_children, scout, stats)
+	v, m = negamax(state, h, -b, -a, evaluate, table, deadline, first,
+					evaluate_children, scout, stats)
+	return (-v, m)
+
+def pvs_search(state, h, a, b, evaluate, table=None, deadline=None,
+				first=None, evaluate_children=None, stats=None):
+	"""Principal-variation search (NegaScout): like negamax_search(), but
+	once the first move has set a value to beat, the other moves are
+	searched with null windows, which cut off much sooner.  It pays off when
+	the first move is usually the best, e.g. with a table or the move
+	ordering of iterative_deepening().  Needs an integer "evaluate"."""
+	return negamax_search(state, h, a, b, evaluate, table, deadline, first,
+							evaluate_children, True, stats)
+
+def iterative_deepening(state, evaluate, deadline=None, max_depth=None,
+						table=None, evaluate_children=None,
+						method=ALPHA_BETA, first_depth=1, stats=None):
+	"""Searches "state" with alpha_beta_search() 1, 2, 3, ... plies deep, each
+	search trying the best move of the one before it first, until the
+	expansions run out, the deadline (a time.time() value, None for no
+	deadline) passes, "max_depth" plies have been searched or the result is
+	a forced win or loss.  The search in progress when the expansions or
+	time run out is abandoned, and the state is put back as it was.
+
+	"table" is as for alpha_beta_search(); using one lets each search also
+	reuse the best moves the shallower ones found deeper in the tree.
+	"evaluate_children" is as for alpha_beta_search(), and is used by all
+	  the methods.
+	"method" is the search to use: MINIMAX (minimax_search(), which takes no
+	  table and can't reuse the previous best move), ALPHA_BETA
+	  (alpha_beta_search()), NEGAMAX (negamax_search()) or PVS
+	  (pvs_search()).
+	"first_depth" is the depth of the first search, for searches that can
+	  skip the shallow ones (e.g. when another process is doing those).
+	"stats" is an optional SearchStats to count the searches in.
+
+	Returns a 3-tuple (value, move, depth) from the deepest search that
+	finished, or (None, None, 0) if none did."""
+	if deadline is None:
+		deadline = NO_DEADLINE
+	base = len(state.moveStack)
+	best = (None, None, 0)
+	h = first_depth
+	while max_depth is None or h <= max_depth:
+		try:
+			if method == MINIMAX:
+				v, m = minimax_search(state, h, evaluate, deadline,
+										evaluate_children, stats)
+			elif method == ALPHA_BETA:
+				v, m = alpha_beta_search(state, h, -sys.maxint-1, sys.maxint,
+										evaluate, table, deadline, best[1],
+										evaluate_children, stats)
+			else:
+				v, m = negamax_search(state, h, -sys.maxint-1, sys.maxint,
+										evaluate, table, deadline, best[1],
+										evaluate_children, method == PVS,
+										stats)
+		except SearchTimeout:
+			# Take back the moves of the abandoned search
+			while len(state.moveStack) > base:
+				state.pop_move()
+			break
+		best = (v, m, h)
+		# Searching deeper won't change a finished game or a forced result
+		if m is None or abs(v) >= WIN:
+			break
+		h += 1
+	return best
@@ -0,0 +1,139 @@
+import ctypes
+import multiprocessing
+import sys
+
+import game_controller
+import game_search
+
+# Lazy SMP: a parallel iterative-deepening search for any GameState whose
+# repeated_rep() is a 64-bit integer key.
+#
+# Helper processes search the same position as the main search, at the same
+# time, and all of them share one game_transposition.SharedTranspositionTable.
+# Nothing divides the work up: the helpers' results reach the main search
+# through the table, as cutoffs and best moves to try first, so it gets
+# deeper in the same time.  Half of the helpers start a ply deeper than the
+# main search so that they don't all keep searching the same tree.  The move
+# played is always the main search's.
+#
+# Helpers are forked afresh for every move and inherit everything they need,
+# so nothing has to be pickled and no processes are left behind between moves.
+
+class HelperCounter(game_controller.GameExpansionCounter):
+	"""An expansion counter for a helper search, which reads as empty once
+	the main search has finished, so the helper stops too."""
+	def __init__(self, count, deadline, stop):
+		""""stop" is a shared ctypes value set to non-zero to stop the
+		helper."""
+		self.stop = stop
+		game_controller.GameExpansionCounter.__init__(self, count, deadline)
+
+	def get_count(self):
+		if self.stop.value:
+			return 0
+		return self.left
+
+	def set_count(self, count):
+		self.left = count
+
+	count = property(get_count, set_count)
+
+class LazySMP(object):
+	"""Runs Lazy SMP searches with a given evaluation function and table.
+
+	Not intended to be subclassed."""
+
+	def __init__(self, evaluate, helpers, table, method=game_search.PVS,
+				evaluate_children=None):
+		""""evaluate" is as for game_search (see there).
+		"helpers" is the number of helper processes to start for each search.
+		"table" is the game_transposition.SharedTranspositionTable the
+		  searches share; it must have been created in this process.
+		"method" is as for game_search.iterative_deepening(), other than
+		  MINIMAX.
+		"evaluate_children" is an optional batch version of "evaluate", as
+		  for game_search.alpha_beta_search()."""
+		self.evaluate = evaluate
+		self.evaluate_children = evaluate_children
+		self.helpers = helpers
+		self.table = table
+		self.method = method
+		self.stop = multiprocessing.RawValue(ctypes.c_int, 0)
+		# The expansions each helper used in the last search
+		self.used = multiprocessing.RawArray(ctypes.c_long, max(1, helpers))
+
+	def helper_search(self, k, state, share, deadline):
+		"""The body of helper process k: searches "state" with at most
+		"share" expansions (None for no limit) until the main search is done
+		or the deadline passes."""
+		if share is None:
+			share = sys.maxint
+		counter = HelperCounter(share, deadline, self.stop)
+		state.set_counter(counter)
+		try:
+			game_search.iterative_deepening(state, self.evaluate, deadline,
+											None, self.table,
+											self.evaluate_children,
+											self.method, 1 + k % 2)
+		finally:
+			self.used[k] = share - counter.left
+
+	def search(self, state, deadline=None, stats=None):
+		"""Searches "state" with iterative deepening in this process and the
+		helpers in theirs, until the expansions or the deadline (a
+		time.time() value) run out, or the main search reaches a forced
+		result.
+
+		The turn's remaining expansions are shared out evenly between the
+		main search and the helpers, and charged to "state" afterwards.  If
+		this process can't start processes of its own (as in the worker
+		processes of a tournament run with "game.py -j"), the main search
+		runs alone, with all of them.
+
+		"stats" is an optional game_search.SearchStats to count the main
+		search in (the helpers' searches aren't counted).
+
+		Returns a 3-tuple (value, move, depth) from the main search, as for
+		game_search.iterative_deepening()."""
+		helpers = self.helpers
+		if multiprocessing.current_process().daemon:
+			helpers = 0
+		budget = state.expansions_count()
+		shares = [None] * (helpers + 1)
+		if budget is not None:
+			shares = [budget // (helpers + 1) \
+						+ (1 if k < budget % (helpers + 1) else 0) \
+						for k in range(helpers + 1)]
+		self.table.new_search()
+		self.stop.value = 0
+		processes = []
+		for k in range(helpers):
+			copy = state.make_copy()
+			copy.set_counter(None)
+			self.used[k] = 0
+			p = multiprocessing.Process(target=self.helper_search,
+										args=(k, copy, shares[k + 1], deadline))
+			p.daemon = True
+			p.start()
+			processes.append(p)
+
+		main = state.make_copy()
+		counter = None
+		if shares[0] is not None:
+			counter = game_controller.GameExpansionCounter(shares[0], deadline)
+			main.set_counter(counter)
+		try:
+			result = game_search.iterative_deepening(main, self.evaluate,
+									deadline, None, self.table,
+									self.evaluate_children, self.method, 1,
+									stats)
+		finally:
+			self.stop.value = 1
+			for p in processes:
+				p.join()
+
+		if counter is not None:
+			used = shares[0] - counter.count \
+					+ sum([self.used[k] for k in range(helpers)])
+			state.use_expansions(used)
+		return result
@@ -1,4 +1,5 @@
 import copy
+import time
 import weakref
 
 class GameSuccessor(object):
@@ -56,9 +57,17 @@ class GameState(object):
 	  is_valid_move(),
 	  move(),
 	  handle_cycle(),
-	  successor_moves()"""
+	  successor_moves()
+	and, optionally (the defaults work by copying the whole state):
+	  push_move(),
+	  pop_move()
+	and, optionally (the default works from successor_moves()):
+	  iter_successor_moves()
+	and, optionally (the default works from is_win()):
+	  winner()"""
 	def __init__(self):
 		self.moveCounter = None
+		self.moveStack = []
 	
 	def set_counter(self, moveCounter):
 		"""Sets a move counter to be shared between this state and its successors.
@@ -82,7 +91,9 @@ class GameState(object):
 	def repeated_rep(self):
 		"""Override in subclass ONLY if game has cycles.
 		
-		Returns a representation of the state which is suitable for hashing"""
+		Returns a representation of the state which is suitable for hashing.
+		A precomputed integer key (e.g., a Zobrist hash) is cheapest, as
+		this is called on every move of the game and by searching players."""
 		pass
 	
 	def copy_into(self, other):
@@ -118,6 +129,16 @@ class GameState(object):
 		"player" parameter is a player's game ID"""
 		pass
 	
+	def winner(self):
+		"""Override in subclass for speed.
+		
+		Returns the game ID of a player who has won, or None if nobody has.
+		The default asks is_win() about each player in turn."""
+		for player in self.get_players():
+			if self.is_win(player):
+				return player
+		return None
+	
 	def get_players(self):
 		"""Override in subclass.
 			
@@ -177,6 +198,14 @@ class GameState(object):
 		else:
 			return self.moveCounter.count
 		
+	def time_remaining(self):
+		"""Returns the number of seconds the controller will allow for the
+		remainder of the turn, or None if there is no time limit"""
+		if not self.moveCounter or self.moveCounter.deadline == None:
+			return None
+		else:
+			return self.moveCounter.deadline - time.time()
+		
 	def successor_moves(self):
 		"""Override in subclass.
 		
@@ -188,13 +217,55 @@ class GameState(object):
 		
 		Returns None if the GameController indicates that we are not allowed to
 		generate any more successors"""
-		if self.moveCounter == None:
+		if self.use_expansion():
 			return []
+		else:
+			return None
+	
+	def use_expansion(self):
+		"""Uses up one of the expansions the controller allows for the turn,
+		as successor_moves() does.  For searches which explore the game some
+		other way (e.g., Monte Carlo playouts) but should keep to the same
+		budget.
+		
+		Returns False if no expansions are left, True otherwise"""
+		if self.moveCounter == None:
+			return True
 		elif self.moveCounter.count > 0:
 			self.moveCounter.count -= 1
-			return []
+			return True
 		else:
+			return False
+	
+	def use_expansions(self, n):
+		"""Uses up "n" expansions at once, as "n" calls to use_expansion()
+		would: the count doesn't go below zero.  For charging a turn with
+		expansions used elsewhere (e.g., by copies searched in other
+		processes).
+		
+		Returns False if fewer than "n" expansions were left, True otherwise"""
+		if self.moveCounter == None:
+			return True
+		used = max(min(n, self.moveCounter.count), 0)
+		self.moveCounter.count -= used
+		return used >= n
+	
+	def iter_successor_moves(self):
+		"""Override in subclass for speed.
+		
+		Like successor_moves(), but returns an iterator over the moves, so a
+		subclass can put off generating each move until it's asked for.  The
+		expansion is counted when this is called, not as the moves are used.
+		The state must be the same as when this was called every time the
+		iterator is advanced (e.g., take moves back with pop_move() before
+		going on to the next one).
+		
+		Returns None if the GameController indicates that we are not allowed to
+		generate any more successors"""
+		moves = self.successor_moves()
+		if moves == None:
 			return None
+		return iter(moves)
 	
 	def move_copy(self, move):
 		"""Like move(), above, but returns a copy of the game state after the
@@ -210,6 +281,30 @@ class GameState(object):
 		player, clear = r.move(move)
 		return (player, r)
 	
+	def push_move(self, move):
+		"""Override in subclass for speed.
+		
+		Like move(), but remembers enough to take the move back with pop_move(),
+		so a search can walk the game tree on one state object instead of
+		copying the state for every child.  The default implementation saves
+		a complete copy of the state.
+		
+		Returns (None, False) and remembers nothing if the move is invalid.
+		
+		move is an object whose type is a game-specific subclass of GameMove"""
+		saved = self.make_copy()
+		player, clear = self.move(move)
+		if player is None:
+			return (None, False)
+		self.moveStack.append(saved)
+		return (player, clear)
+	
+	def pop_move(self):
+		"""Override in subclass for speed (along with push_move()).
+		
+		Takes back the last move made with push_move()."""
+		self.moveStack.pop().copy_into(self)
+	
 	def successors(self):
 		"""Returns a valid list of GameSuccessor objects.  Each one contains
 		a valid move on the current state (obtained with successor_moves() above) and
@@ -225,4 +320,22 @@ class GameState(object):
 		s = [GameSuccessor(moves[i], s[i][1]) for i in range(len(moves))]
 		#s = zip([x[0] for x in s], [x[1] for x in s], moves)
 		return s
+	
+	def iter_successors(self):
+		"""Like successors(), but returns an iterator over the GameSuccessor
+		objects, each one's state being copied only when the iterator gets to
+		it.  A search that stops early (e.g., an alpha-beta cutoff) doesn't pay
+		for the successors it never looks at.  The successors' states are
+		copies, so they may be changed freely, but this state must not be
+		changed while the iterator is in use.
+		
+		Returns None if the GameController indicates that we are not allowed to
+		generate any more successors"""
+		moves = self.iter_successor_moves()
+		if moves == None:
+			return None
+		def successors(moves):
+			for m in moves:
+				yield GameSuccessor(m, self.move_copy(m)[1])
+		return successors(moves)
 	
\ No newline at end of file
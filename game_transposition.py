@@ -0,0 +1,295 @@
+import array
+import ctypes
+import multiprocessing
+
+class TranspositionTable(object):
+	"""A fixed-size cache of search results, keyed by a state's
+	repeated_rep() (or any other hashable position key), for use by any
+	GamePlayer.  Each entry holds the depth searched, the value found, what
+	kind of bound the value is and the best move.
+
+	Entries live in preallocated parallel lists, so the table never grows
+	past the memory budget it was created with.  Given functions to turn
+	moves into small integers and back, it keeps them in compact arrays
+	instead, and many more entries fit in the budget; the keys must then be
+	integers from 0 to 2**64 - 1 (e.g. Zobrist keys) and the values fit in a
+	signed 64-bit integer.  When two positions want the same slot, the
+	replacement policy decides which one is kept:
+	  DEPTH_PREFERRED -- keep the deeper search (entries left over from
+	    previous moves are always replaced)
+	  ALWAYS_REPLACE -- keep the newest entry
+	  TWO_TIER -- slots come in pairs, a depth-preferred one and an
+	    always-replace one, so deep results survive and new ones are still
+	    cached
+
+	SharedTranspositionTable keeps the same kind of entries in memory shared
+	between processes."""
+
+	# Kinds of bound a stored value can be
+	EXACT = 0
+	LOWER = 1
+	UPPER = 2
+
+	# Replacement policies
+	DEPTH_PREFERRED = 0
+	ALWAYS_REPLACE = 1
+	TWO_TIER = 2
+
+	# Memory used by one entry, in bytes, as measured with Gobblet (the growth
+	# of the RSS of a full table): in the lists, the slots and the objects
+	# they hold (a long key and a GobbletMove with its GobbletPiece and
+	# coordinate tuples); in the arrays, just the items
+	ENTRY_BYTES = 1120
+	CODED_ENTRY_BYTES = 26
+
+	def __init__(self, max_bytes=16 * 1024 * 1024, policy=DEPTH_PREFERRED,
+				encode_move=None, decode_move=None):
+		""""max_bytes" is the memory budget for the table.
+
+		"policy" is one of DEPTH_PREFERRED, ALWAYS_REPLACE or TWO_TIER.
+		"encode_move" is an optional function taking a move and returning an
+		  integer from 0 to 65534, and "decode_move" its reverse; with them,
+		  the table uses compact arrays."""
+		self.policy = policy
+		self.encode_move = encode_move
+		self.decode_move = decode_move
+		entryBytes = TranspositionTable.ENTRY_BYTES if encode_move is None \
+						else TranspositionTable.CODED_ENTRY_BYTES
+		self.size = max(2, max_bytes // entryBytes)
+		if policy == TranspositionTable.TWO_TIER:
+			self.size -= self.size % 2
+		self.generation = 0
+		self.clear()
+
+	def clear(self):
+		"""Empties the table and zeroes the counters."""
+		if self.encode_move is None:
+			self.keys = [None] * self.size
+			self.depths = [0] * self.size
+			self.values = [0] * self.size
+			self.bounds = [TranspositionTable.EXACT] * self.size
+			self.moves = [None] * self.size
+			self.generations = [0] * self.size
+		else:
+			self.keys = array.array("L", [0]) * self.size
+			self.depths = array.array("B", [0]) * self.size
+			self.values = array.array("l", [0]) * self.size
+			self.bounds = array.array("B", [TranspositionTable.EXACT]) \
+							* self.size
+			# Each move's code plus 1, 0 for none
+			self.moves = array.array("H", [0]) * self.size
+			self.generations = array.array("B", [0]) * self.size
+		self.hits = 0
+		self.misses = 0
+		self.collisions = 0
+
+	def new_search(self):
+		"""Marks the entries stored so far as left over from an earlier
+		search, so the depth-preferred policy will let them be replaced.
+		Call this once at the start of every move."""
+		self.generation += 1
+
+	def stamp(self):
+		"""Returns what entries stored in the current search are marked with:
+		from 1 to 255, since 0 marks an empty slot.  Entries from 255
+		searches ago look current again, which only matters to replacement."""
+		return self.generation % 255 + 1
+
+	def slots(self, key):
+		"""Returns the list indices where the indicated key may be stored."""
+		if self.policy == TranspositionTable.TWO_TIER:
+			i = (hash(key) % (self.size // 2)) * 2
+			return (i, i + 1)
+		return (hash(key) % self.size,)
+
+	def probe(self, key):
+		"""Looks up a position.
+
+		Returns a 4-tuple (depth, value, bound, move), or None if the position
+		is not in the table."""
+		collided = False
+		for i in self.slots(key):
+			if not self.generations[i]:
+				continue
+			if self.keys[i] == key:
+				self.hits += 1
+				move = self.moves[i]
+				if self.decode_move is not None:
+					move = None if move == 0 else self.decode_move(move - 1)
+				return (self.depths[i], self.values[i], self.bounds[i], move)
+			collided = True
+		self.misses += 1
+		if collided:
+			self.collisions += 1
+		return None
+
+	def store(self, key, depth, value, bound, move):
+		"""Records the result of searching a position "depth" plies deep.
+
+		"bound" is one of EXACT, LOWER or UPPER, "move" the best move found
+		(may be None).  Depths above 255 are stored as 255."""
+		slots = self.slots(key)
+		i = slots[0]
+		if self.policy == TranspositionTable.TWO_TIER:
+			# The second slot takes whatever the first one won't
+			if self.keys[i] != key and not self.replaces(i, depth):
+				i = slots[1]
+		elif self.policy == TranspositionTable.DEPTH_PREFERRED:
+			if self.keys[i] != key and not self.replaces(i, depth):
+				return
+		if self.encode_move is not None:
+			move = 0 if move is None else self.encode_move(move) + 1
+		self.keys[i] = key
+		self.depths[i] = min(depth, 255)
+		self.values[i] = value
+		self.bounds[i] = bound
+		self.moves[i] = move
+		self.generations[i] = self.stamp()
+
+	def replaces(self, i, depth):
+		"""Returns True if a search "depth" plies deep should take over slot i
+		under the depth-preferred rule."""
+		return not self.generations[i] or self.depths[i] <= depth \
+				or self.generations[i] != self.stamp()
+
+	def lookup(self, key, depth, a, b):
+		"""Probes the table on behalf of an alpha-beta search of "depth" plies
+		with the window (a, b).
+
+		Returns a 2-tuple (value, move).  "value" is the value to return for
+		the position if the stored result is deep enough to settle it, None
+		otherwise; "move" is the stored best move (None if there isn't one),
+		which is worth searching first either way."""
+		entry = self.probe(key)
+		if entry is None:
+			return (None, None)
+		e_depth, value, bound, move = entry
+		if e_depth >= depth:
+			if bound == TranspositionTable.EXACT \
+					or (bound == TranspositionTable.LOWER and value >= b) \
+					or (bound == TranspositionTable.UPPER and value <= a):
+				return (value, move)
+		return (None, move)
+
+	def record(self, key, depth, value, a, b, move):
+		"""Stores the result of an alpha-beta search of "depth" plies with the
+		window (a, b), working out what kind of bound "value" is."""
+		if value <= a:
+			bound = TranspositionTable.UPPER
+		elif value >= b:
+			bound = TranspositionTable.LOWER
+		else:
+			bound = TranspositionTable.EXACT
+		self.store(key, depth, value, bound, move)
+
+	def stats(self):
+		"""Returns a dictionary of the table's counters."""
+		used = len([g for g in self.generations if g])
+		return {"hits": self.hits, "misses": self.misses,
+				"collisions": self.collisions, "used": used, "size": self.size}
+
+
+class SharedTranspositionTable(TranspositionTable):
+	"""A TranspositionTable in memory shared by processes, so that searches
+	running in parallel (see game_smp) can use each other's results.  It
+	must be created before the processes that share it are started.
+
+	Only the depth-preferred policy is offered.  Position keys must be
+	integers from 0 to 2**64 - 1 (e.g. Zobrist keys) and values must fit in
+	a signed 64-bit integer; moves are stored as integers from 0 to 65534,
+	converted with the functions the table is given.
+
+	Each entry is three 64-bit words: the value, the other fields packed
+	together, and the key XORed with both.  Processes read and write entries
+	without locking, so a read may catch an entry half-written by another
+	process; the XOR no longer matches the key then, and the entry is
+	treated as missing.  The counters (hits, misses, collisions) are kept
+	separately in each process."""
+
+	# Bytes used by one entry
+	ENTRY_BYTES = 24
+
+	MASK = (1 << 64) - 1
+
+	def __init__(self, max_bytes, encode_move, decode_move):
+		""""max_bytes" is the memory budget for the table.
+		"encode_move" is a function taking a move and returning an integer
+		  from 0 to 65534, and "decode_move" its reverse."""
+		self.policy = TranspositionTable.DEPTH_PREFERRED
+		self.size = max(2, max_bytes // SharedTranspositionTable.ENTRY_BYTES)
+		self.encode_move = encode_move
+		self.decode_move = decode_move
+		self.words = multiprocessing.RawArray(ctypes.c_uint64, 3 * self.size)
+		self.shared_generation = multiprocessing.RawValue(ctypes.c_int, 0)
+		self.hits = 0
+		self.misses = 0
+		self.collisions = 0
+
+	def clear(self):
+		"""Empties the table and zeroes this process's counters."""
+		ctypes.memset(self.words, 0, ctypes.sizeof(self.words))
+		self.hits = 0
+		self.misses = 0
+		self.collisions = 0
+
+	def new_search(self):
+		"""As for TranspositionTable.  Only one of the processes sharing the
+		table should call it."""
+		self.shared_generation.value = (self.shared_generation.value + 1) % 256
+
+	def get_generation(self):
+		return self.shared_generation.value
+
+	generation = property(get_generation)
+
+	def read(self, i):
+		"""Returns the (key, value, data) words of slot i, or None if it is
+		empty or caught half-written."""
+		words = self.words
+		check = words[3*i]
+		value = words[3*i + 1]
+		data = words[3*i + 2]
+		if data == 0:
+			return None
+		return (check ^ value ^ data, value, data)
+
+	def probe(self, key):
+		"""As for TranspositionTable."""
+		i = hash(key) % self.size
+		entry = self.read(i)
+		if entry is not None and entry[0] == key:
+			self.hits += 1
+			value, data = entry[1:]
+			if value >> 63:
+				value -= 1 << 64
+			move = (data & 0xffff) - 1
+			return (int((data >> 16) & 0xff), int(value),
+					int((data >> 24) & 3),
+					None if move < 0 else self.decode_move(move))
+		self.misses += 1
+		if entry is not None:
+			self.collisions += 1
+		return None
+
+	def store(self, key, depth, value, bound, move):
+		"""As for TranspositionTable.  Depths above 255 are stored as 255."""
+		i = hash(key) % self.size
+		entry = self.read(i)
+		if entry is not None and entry[0] != key \
+				and (entry[2] >> 16) & 0xff > depth \
+				and (entry[2] >> 32) & 0xff == self.generation:
+			return
+		value &= SharedTranspositionTable.MASK
+		data = (0 if move is None else self.encode_move(move) + 1) \
+				| (min(depth, 255) << 16) | (bound << 24) \
+				| (self.generation << 32)
+		words = self.words
+		words[3*i + 1] = value
+		words[3*i + 2] = data
+		words[3*i] = key ^ value ^ data
+
+	def stats(self):
+		"""As for TranspositionTable (a slow scan of the whole table)."""
+		used = len([i for i in xrange(self.size) if self.read(i) is not None])
+		return {"hits": self.hits, "misses": self.misses,
+				"collisions": self.collisions, "used": used, "size": self.size}
@@ -1,3 +1,6 @@
+import array
+import random
+
 import game_state
 
 PLAYERS = ['B', 'O']
@@ -7,6 +10,26 @@ THREES = [[(0,0), (1,1), (2,2)], [(2,0), (1,1), (0,2)], [(0,0), (1,0), (2,0)],
 			[(1,0), (1,1), (1,2)], [(2,0), (2,1), (2,2)]]
 DIAGONAL_PLACES = THREES[:2]
 
+# GobbletState numbers the board locations 0-8 (location (x,y) is cell
+# 3*x + y), so each player's pieces of one size fit in a 9-bit mask.
+CELLS = [(x, y) for x in range(3) for y in range(3)]
+LINE_MASKS = [sum([1 << (3*x + y) for x, y in three]) for three in THREES]
+# WINNING[mask] is True if the cells in "mask" cover a complete line
+WINNING = [any([mask & line == line for line in LINE_MASKS]) \
+				for mask in range(512)]
+
+# Random 64-bit numbers for Zobrist hashing: ZOBRIST[3*player + size][cell]
+# for each piece on the board, ZOBRIST_PLAYER when player 1 is to move.
+# The seed is fixed so keys are the same from run to run.
+_zobrist_random = random.Random(0x60bb1e7)
+ZOBRIST = [[_zobrist_random.getrandbits(64) for cell in range(9)] \
+				for i in range(6)]
+ZOBRIST_PLAYER = _zobrist_random.getrandbits(64)
+# ZOBRIST_MASKS[i][mask] is the XOR of ZOBRIST[i][cell] over the cells in mask
+ZOBRIST_MASKS = [[reduce(lambda key, cell: key ^ row[cell] \
+						if mask & (1 << cell) else key, range(9), 0) \
+					for mask in range(512)] for row in ZOBRIST]
+
 class GobbletPiece(object):
 	"""A class representing a single piece in the game.  Has
 	data members "player" and "size" corresponding to values used
@@ -64,6 +87,27 @@ class GobbletMove(game_state.GameMove):
 			(PLAYERS[self.move.piece.player], SIZES[self.move.piece.size], \
 				self.move.target)
 	
+	def __eq__(self, other):
+		"""Moves are equal if they move the same piece between the same
+		locations (so a search can recognize a move it has seen before)."""
+		if not isinstance(other, GobbletMove):
+			return False
+		return self.repeated_rep() == other.repeated_rep()
+	
+	def __ne__(self, other):
+		return not self == other
+	
+	def __hash__(self):
+		return hash(self.repeated_rep())
+	
+	def repeated_rep(self):
+		"""A representation of the move suitable for hashing."""
+		if self.move is None:
+			return (None, self.forfeit)
+		source = self.move.source
+		return (tuple(source) if source else None, tuple(self.move.target),
+				self.move.piece.repeated_rep(), self.forfeit)
+	
 	def get_player(self):
 		"""Returns the player who's making this move, as represented
 		in the GobbletState class."""
@@ -81,7 +125,19 @@ class GobbletMove(game_state.GameMove):
 class GobbletState(game_state.GameState):
 	"""Defines a complete game state in the Gobblet Gobblers game,
 	as well as the logic of moving from that state.  Subclass of the 
-	GameState class."""
+	GameState class.
+	
+	The board is kept as packed integers rather than stacks of pieces:
+	"bits[3*player + size]" is a 9-bit mask of the cells (see CELLS) holding
+	that player's pieces of that size, and "pieces[3*player + size]" is the
+	number of those pieces still off the board.  A piece can only cover
+	smaller pieces, so the stack on a cell is simply its pieces in order of
+	size.
+	
+	"tops[player]" is kept up to date as moves are made with the mask of the
+	cells where that player's piece is on top, so checking for a win is a
+	single table lookup (see WINNING).  Code that sets "bits" directly must
+	call update_tops() afterwards."""
 	def __init__(self):
 		game_state.GameState.__init__(self)
 		self.clear()
@@ -92,17 +148,18 @@ class GobbletState(game_state.GameState):
 				"%.2s | %.2s | %.2s\n" \
 				"------------\n" \
 				"%.2s | %.2s | %.2s" % \
-				tuple([str(self.board[i][j][-1]) if self.board[i][j] \
-							else '  ' \
-							for i in range(3)
-							for j in range(3)])
+				tuple([str(self.board_value(location)) \
+							if self.board_value(location) else '  ' \
+							for location in CELLS])
 	
 	def clear(self):
 		"""Resets the game to opening state."""
 		self.player = 0
 		self.isDraw = False
-		self.board = [[[] for j in range(3)] for i in range(3)]
-		self.pieces = [[2 for j in range(3)] for i in range(2)]
+		self.bits = [0] * 6
+		self.pieces = [2] * 6
+		self.tops = [0, 0]
+		self.key = 0
 	
 	def repeats(self):
 		"""Simply returns True, as a Gobblet Gobblers game
@@ -110,19 +167,25 @@ class GobbletState(game_state.GameState):
 		return True
 	
 	def repeated_rep(self):
-		"""Returns a hashable representation of the state."""
-		return tuple([tuple([piece.repeated_rep() for piece in place]) \
-						for row in self.board for place in row] \
-					#+ [tuple(player) for player in self.pieces] \
-					+ [self.player])
+		"""Returns a hashable representation of the state: its 64-bit
+		Zobrist key, which is kept up to date as moves are made."""
+		return self.key
+	
+	def zobrist_key(self):
+		"""Computes the Zobrist key of this state from scratch."""
+		key = ZOBRIST_PLAYER if self.player else 0
+		for i, mask in enumerate(self.bits):
+			key ^= ZOBRIST_MASKS[i][mask]
+		return key
 	
 	def copy_into(self, other):
 		"""Copies this state's values onto another GobbletState object."""
 		game_state.GameState.copy_into(self, other)
 		other.player = self.player
-		other.pieces = [[v for v in player] for player in self.pieces]
-		other.board = [[[piece.make_copy() for piece in place] for place in row] \
-						for row in self.board]
+		other.pieces = self.pieces[:]
+		other.bits = self.bits[:]
+		other.tops = self.tops[:]
+		other.key = self.key
 	
 	def make_copy(self):
 		"""Returns a fresh copy of this state."""
@@ -130,20 +193,66 @@ class GobbletState(game_state.GameState):
 		self.copy_into(other)
 		return other
 	
+	def top_piece(self, cell):
+		"""Returns a 2-tuple (player, size) for the top-most piece on a cell
+		(0-8, see CELLS), or None if the cell is empty."""
+		bit = 1 << cell
+		bits = self.bits
+		for size in (2, 1, 0):
+			if bits[size] & bit:
+				return (0, size)
+			if bits[3 + size] & bit:
+				return (1, size)
+		return None
+	
+	def blocked_cells(self, size):
+		"""Returns a mask of the cells a piece of the given size can't be put
+		on, i.e. those already holding a piece at least that big."""
+		bits = self.bits
+		mask = 0
+		for s in range(size, 3):
+			mask |= bits[s] | bits[3 + s]
+		return mask
+	
+	def update_tops(self):
+		"""Recomputes "tops" from "bits"."""
+		bits = self.bits
+		large = bits[2] | bits[5]
+		medium = bits[1] | bits[4]
+		self.tops = [bits[i + 2] | (bits[i + 1] & ~large) \
+						| (bits[i] & ~(large | medium)) for i in (0, 3)]
+	
+	def update_top(self, cell):
+		"""Brings "tops" up to date for one cell after a piece has been taken
+		off it, uncovering whatever was underneath."""
+		bit = 1 << cell
+		tops = self.tops
+		tops[0] &= ~bit
+		tops[1] &= ~bit
+		top = self.top_piece(cell)
+		if top is not None:
+			tops[top[0]] |= bit
+	
+	def visible_cells(self, player):
+		"""Returns a mask of the cells where the indicated player's piece is
+		on top."""
+		return self.tops[player]
+	
 	def is_win(self, player):
 		"""Returns True if this state is a win for the indicated player, False else.
 		
 		"player" is a valid player ID returned by get_players()"""
-		for three in THREES:
-			win = True
-			for pos in three:
-				p1, p2 = pos
-				if not self.board[p1][p2] or self.board[p1][p2][-1].player != player:
-					win = False
-					break
-			if win:
-				return True
-		return False
+		return WINNING[self.tops[player]]
+	
+	def winner(self):
+		"""Returns the player with three in a row, or None if neither has.
+		A move that uncovers the opponent's line while completing the
+		mover's own counts for the mover, as in GameController."""
+		if WINNING[self.tops[1 - self.player]]:
+			return 1 - self.player
+		if WINNING[self.tops[self.player]]:
+			return self.player
+		return None
 	
 	def get_players(self):
 		"""Returns a list of the representations used for the players,
@@ -159,7 +268,14 @@ class GobbletState(game_state.GameState):
 		
 		The location is a 2-tuple (x,y)"""
 		t1,t2 = location
-		return [piece.make_copy() for piece in self.board[t1][t2]]
+		bit = 1 << (3*t1 + t2)
+		stack = []
+		for size in range(3):
+			if self.bits[size] & bit:
+				stack.append(GobbletPiece(0, size))
+			elif self.bits[3 + size] & bit:
+				stack.append(GobbletPiece(1, size))
+		return stack
 		
 	def board_value(self, location):
 		"""Returns the last (top-most) game piece on a given location, or None
@@ -167,16 +283,17 @@ class GobbletState(game_state.GameState):
 		
 		The location is a 2-tuple (x,y)"""
 		t1,t2 = location
-		if not self.board[t1][t2]:
+		top = self.top_piece(3*t1 + t2)
+		if top is None:
 			return None
-		return self.board[t1][t2][-1].make_copy()
+		return GobbletPiece(top[0], top[1])
 	
 	def pieces_available(self, player, size):
 		"""Returns the number of pieces available for the given size (0-2) and
 		the given player.
 		
 		Player is a valid player ID returned by get_players()"""
-		return self.pieces[player][size]
+		return self.pieces[3*player + size]
 	
 	def get_player_state(self, player):
 		"""Returns a player's view of the state (just a copy of this object,
@@ -192,17 +309,13 @@ class GobbletState(game_state.GameState):
 		size = detail.piece.size
 		if detail.source:
 			s1,s2 = detail.source
-			if detail.target == detail.source:
+			if (s1,s2) == (t1,t2):
 				return False
-		if not detail.source and self.pieces[self.player][size] <= 0:
-			return False
-		if detail.source and not self.board[s1][s2]:
-			return False
-		if detail.source and \
-				(self.board[s1][s2][-1].player != self.player \
-					or self.board[s1][s2][-1].size != size):
+			if self.top_piece(3*s1 + s2) != (self.player, size):
+				return False
+		elif self.pieces[3*self.player + size] <= 0:
 			return False
-		if self.board[t1][t2] and self.board[t1][t2][-1].size >= size:
+		if self.blocked_cells(size) & (1 << (3*t1 + t2)):
 			return False
 		return True
 	
@@ -213,17 +326,108 @@ class GobbletState(game_state.GameState):
 		for the GameController to forget visited states up to this point."""
 		if not self.is_valid_move(move):
 			return (None, False)
+		self.make_move(*self.move_cells(move))
+		return self.player, (move.get_move().source is None)
+	
+	def move_cells(self, move):
+		"""Returns a 3-tuple (i, source, target) describing a move in terms of
+		the packed board: "i" indexes the bits and pieces lists, "source" is
+		the cell the piece is taken from (None for a new piece) and "target"
+		the cell it lands on."""
 		detail = move.get_move()
 		t1,t2 = detail.target
-		size = detail.piece.size
+		i = 3*move.get_player() + detail.piece.size
 		if detail.source:
 			s1,s2 = detail.source
-			self.board[s1][s2] = self.board[s1][s2][:-1]
+			return (i, 3*s1 + s2, 3*t1 + t2)
+		return (i, None, 3*t1 + t2)
+	
+	def move_number(self, move):
+		"""Returns the number of a move in this state (see MOVE_TABLE)."""
+		i, source, target = self.move_cells(move)
+		if source is None:
+			return MOVE_NUMBERS[(i % 3, None, target)]
+		return MOVE_NUMBERS[(None, source, target)]
+	
+	def number_cells(self, k):
+		"""Returns the 3-tuple (i, source, target) (see move_cells()) for
+		the move numbered k in this state, which must be legal."""
+		size, source, target = MOVE_TABLE[k]
+		if source is None:
+			return (3*self.player + size, None, target)
+		# The player's biggest piece on the cell is the one on top
+		bit = 1 << source
+		i = 3*self.player + 2
+		while not self.bits[i] & bit:
+			i -= 1
+		return (i, source, target)
+	
+	def push_number(self, k):
+		"""Like push_move(), but for a move given by its number (see
+		MOVE_TABLE), without checking it."""
+		cells = self.number_cells(k)
+		self.moveStack.append(cells)
+		self.make_move(*cells)
+	
+	def number_move(self, k):
+		"""The reverse of move_number(): returns the GobbletMove numbered k
+		in this state, or None if there is no piece to move from the
+		indicated cell."""
+		size, source, target = MOVE_TABLE[k]
+		if source is not None:
+			top = self.top_piece(source)
+			if top is None:
+				return None
+			size = top[1]
+		return cells_move(3*self.player + size, source, target)
+	
+	def make_move(self, i, source, target):
+		"""Makes a move given as by move_cells(), without checking it."""
+		player = self.player
+		if source is None:
+			self.pieces[i] -= 1
+		else:
+			self.bits[i] &= ~(1 << source)
+			self.key ^= ZOBRIST[i][source]
+			self.update_top(source)
+		bit = 1 << target
+		self.bits[i] |= bit
+		# The piece covers whatever was on the target
+		self.tops[player] |= bit
+		self.tops[1 - player] &= ~bit
+		self.key ^= ZOBRIST[i][target] ^ ZOBRIST_PLAYER
+		self.player = (player + 1) % 2
+	
+	def push_move(self, move):
+		"""Like move(), but remembers the move so pop_move() can take it back."""
+		if not self.is_valid_move(move):
+			return (None, False)
+		cells = self.move_cells(move)
+		self.push_cells(cells)
+		return self.player, (cells[1] is None)
+	
+	def push_cells(self, cells):
+		"""Like push_move(), but for a move given as a 3-tuple from
+		move_cells() or successor_cells(), without checking it."""
+		self.moveStack.append(cells)
+		self.make_move(*cells)
+	
+	def pop_move(self):
+		"""Takes back the last move made with push_move()."""
+		i, source, target = self.moveStack.pop()
+		player = (self.player + 1) % 2
+		self.player = player
+		self.bits[i] &= ~(1 << target)
+		self.key ^= ZOBRIST[i][target] ^ ZOBRIST_PLAYER
+		self.update_top(target)
+		if source is None:
+			self.pieces[i] += 1
 		else:
-			self.pieces[self.player][size] -= 1
-		self.board[t1][t2].append(detail.piece.make_copy())
-		self.player = (self.player + 1) % 2
-		return self.player, (detail.source is None)
+			bit = 1 << source
+			self.bits[i] |= bit
+			self.tops[player] |= bit
+			self.tops[1 - player] &= ~bit
+			self.key ^= ZOBRIST[i][source]
 		
 	def handle_cycle(self):
 		"""Handles a cycle in the game (by declaring it a draw, in Gobblet
@@ -233,62 +437,215 @@ class GobbletState(game_state.GameState):
 	def successor_moves(self):
 		"""Returns a list of GobbletMoves which are legal moves to
 		make in this state."""
+		moves = self.iter_successor_moves()
+		if moves is None:
+			return None
+		return list(moves)
+	
+	def iter_successor_moves(self):
+		"""Like successor_moves(), but returns an iterator which makes each
+		GobbletMove as it is needed (see GameState.iter_successor_moves())."""
+		if self.isDraw:
+			return iter([])
+		if game_state.GameState.successor_moves(self) is None:
+			return None
+		return self.generate_moves()
+	
+	def generate_moves(self):
+		"""A generator of the legal GobbletMoves in this state: placements
+		from the reserve, smallest piece first, then moves of the pieces on
+		top of the board."""
+		for i, source, target in self.generate_cells():
+			yield cells_move(i, source, target)
+	
+	def successor_cells(self):
+		"""Returns a list of the legal moves in this state as 3-tuples
+		(i, source, target) (see move_cells()), in the same order as
+		successor_moves().  Doesn't use an expansion, so searches which
+		don't need GobbletMoves (e.g., random playouts) must count their
+		own."""
 		if self.isDraw:
 			return []
-		successors = game_state.GameState.successor_moves(self)
-		if successors is None:
+		return list(self.generate_cells())
+	
+	def successor_numbers(self):
+		"""Like successor_moves(), but returns an array (array.array('B'))
+		of the moves' numbers (see MOVE_TABLE), in the same order, without
+		making any GobbletMoves.  Uses an expansion, and returns None if
+		there are none left."""
+		if self.isDraw:
+			return array.array('B')
+		if game_state.GameState.successor_moves(self) is None:
 			return None
+		return array.array('B', self.move_numbers())
+	
+	def move_numbers(self):
+		"""Returns a list of the numbers of the legal moves in this state, in
+		the same order as successor_moves().  Doesn't use an expansion, so
+		searches which don't need GobbletMoves (e.g., random playouts) must
+		count their own."""
+		if self.isDraw:
+			return []
+		player = self.player
+		bits = self.bits
+		pieces = self.pieces
+		# blocked[size] is blocked_cells(size)
+		large = bits[2] | bits[5]
+		medium = large | bits[1] | bits[4]
+		blocked = (medium | bits[0] | bits[3], medium, large)
+		numbers = []
+		for size in range(3):
+			if pieces[3*player + size] > 0:
+				numbers.extend(PLACE_NUMBERS[size][~blocked[size] & 511])
+		visible = self.tops[player]
+		if visible:
+			for s in range(9):
+				bit = 1 << s
+				if not visible & bit:
+					continue
+				i = 3*player + 2
+				while not bits[i] & bit:
+					i -= 1
+				numbers.extend(BOARD_NUMBERS[s][~blocked[i % 3] & 511])
+		return numbers
+	
+	def generate_cells(self):
+		"""A generator of the moves of generate_moves(), as 3-tuples (see
+		move_cells())."""
+		player = self.player
 		for size in range(3):
-			if self.pieces[self.player][size] <= 0:
+			i = 3*player + size
+			if self.pieces[i] <= 0:
+				continue
+			blocked = self.blocked_cells(size)
+			for t in range(9):
+				if not blocked & (1 << t):
+					yield (i, None, t)
+		visible = self.visible_cells(player)
+		for s in range(9):
+			if not visible & (1 << s):
 				continue
-			for t1 in range(3):
-				for t2 in range(3):
-					if not self.board[t1][t2] or self.board[t1][t2][-1].size <= size:
-						move = GobbletMove(GobbletMoveDetail(None, 
-														(t1,t2), 
-														GobbletPiece(self.player, size)))
-						if self.is_valid_move(move):
-							successors.append(move)
-		for s1 in range(3):
-			for s2 in range(3):
-				if self.board[s1][s2] and self.board[s1][s2][-1].player == self.player:
-					size = self.board[s1][s2][-1].size
-					for t1 in range(3):
-						for t2 in range(3):
-							if s1 == t1 and s2 == t2:
-								continue
-							if not self.board[t1][t2] or self.board[t1][t2][-1].size <= size:
-								move = GobbletMove(GobbletMoveDetail((s1,s2), 
-														(t1,t2), 
-														GobbletPiece(self.player, size)))
-								if self.is_valid_move(move):
-									successors.append(move)
-		return successors
+			i = 3*player + self.top_piece(s)[1]
+			blocked = self.blocked_cells(i % 3) | (1 << s)
+			for t in range(9):
+				if not blocked & (1 << t):
+					yield (i, s, t)
 
-def mirror(state):
-	"""Returns the mirror-image of the provided state."""
+def cells_move(i, source, target):
+	"""The reverse of GobbletState.move_cells(): returns the GobbletMove
+	for a move given as a 3-tuple (i, source, target)."""
+	return GobbletMove(GobbletMoveDetail(None if source is None \
+						else CELLS[source], CELLS[target], 
+						GobbletPiece(i // 3, i % 3)))
+
+# Every Gobblet Gobblers move has a number from 0 to NUM_MOVES - 1, for
+# compact records of games.  MOVE_TABLE[k] is a 3-tuple (size, source,
+# target) for move k: first placing a piece of each size on each cell
+# (source None), then moving the top piece of one cell to another (size
+# None).  Whose piece it is follows from the state the move is made in.
+MOVE_TABLE = [(size, None, target) for size in range(3) \
+				for target in range(9)] \
+			+ [(None, source, target) for source in range(9) \
+				for target in range(9) if source != target]
+NUM_MOVES = len(MOVE_TABLE)
+# MOVE_NUMBERS maps the entries of MOVE_TABLE back to their numbers
+MOVE_NUMBERS = dict([(m, k) for k, m in enumerate(MOVE_TABLE)])
+# PLACE_NUMBERS[size][mask] lists the numbers of the moves placing a piece of
+# the given size on the cells in "mask", and BOARD_NUMBERS[source][mask]
+# those moving the top piece of cell "source" to the cells in "mask"
+PLACE_NUMBERS = [[[MOVE_NUMBERS[(size, None, t)] for t in range(9) \
+					if mask & (1 << t)] for mask in range(512)] \
+				for size in range(3)]
+BOARD_NUMBERS = [[[MOVE_NUMBERS[(None, s, t)] for t in range(9) \
+					if mask & (1 << t) and t != s] for mask in range(512)] \
+				for s in range(9)]
+
+def move_code(move):
+	"""Returns an integer for a GobbletMove which, unlike its number in
+	MOVE_TABLE, doesn't need the state to be turned back into the move
+	(e.g., for a transposition table): its number plus NUM_MOVES times its
+	piece's index in GobbletState.bits."""
+	detail = move.get_move()
+	t1,t2 = detail.target
+	if detail.source:
+		s1,s2 = detail.source
+		k = MOVE_NUMBERS[(None, 3*s1 + s2, 3*t1 + t2)]
+	else:
+		k = MOVE_NUMBERS[(detail.piece.size, None, 3*t1 + t2)]
+	return k + NUM_MOVES * (3*detail.piece.player + detail.piece.size)
+
+def code_move(code):
+	"""The reverse of move_code()."""
+	i, k = divmod(code, NUM_MOVES)
+	return cells_move(i, MOVE_TABLE[k][1], MOVE_TABLE[k][2])
+
+# MIRROR_CELLS[i] and ROTATE_CELLS[i] give the cell that a piece on cell i
+# lands on when the board is mirrored or rotated
+MIRROR_CELLS = [3*x + 2 - y for x, y in CELLS]
+ROTATE_CELLS = [3*y + 2 - x for x, y in CELLS]
+
+# The 8 symmetries of the board: SYMMETRY_CELLS[t] for t = 0-3 rotates the
+# board t times, and for t = 4-7 rotates it t-4 times and then mirrors it.
+SYMMETRY_CELLS = [range(9)]
+for _t in range(3):
+	SYMMETRY_CELLS.append([ROTATE_CELLS[c] for c in SYMMETRY_CELLS[-1]])
+SYMMETRY_CELLS += [[MIRROR_CELLS[c] for c in cells] for cells in SYMMETRY_CELLS]
+# INVERSE_SYMMETRY[t] is the symmetry that undoes symmetry t
+INVERSE_SYMMETRY = [[u for u in range(8) \
+						if [SYMMETRY_CELLS[u][c] for c in cells] == range(9)][0] \
+					for cells in SYMMETRY_CELLS]
+# SYMMETRY_MASKS[t][mask] is the cell mask "mask" under symmetry t
+SYMMETRY_MASKS = [[sum([1 << cells[c] for c in range(9) if mask & (1 << c)]) \
+						for mask in range(512)] for cells in SYMMETRY_CELLS]
+
+def canonical_key(state):
+	"""Returns a 2-tuple (key, t): "key" is the smallest Zobrist key of the
+	provided state under any of the 8 symmetries of the board, and "t" the
+	symmetry (see SYMMETRY_CELLS) that gives it.  All symmetric states get
+	the same key, and no copies of the state are made to find it.
+	
+	A move found for the canonical state is turned into one for the provided
+	state with transform_move(move, INVERSE_SYMMETRY[t])."""
+	side = ZOBRIST_PLAYER if state.player else 0
+	bits = state.bits
+	best = None
+	for t, table in enumerate(SYMMETRY_MASKS):
+		key = side
+		for i in range(6):
+			key ^= ZOBRIST_MASKS[i][table[bits[i]]]
+		if best is None or key < best[0]:
+			best = (key, t)
+	return best
+
+def transform(state, t):
+	"""Returns a copy of the provided state under symmetry t (see
+	SYMMETRY_CELLS)."""
 	r = state.make_copy()
-	for i in range(3):
-		t = r.board[i][0]
-		r.board[i][0] = r.board[i][2]
-		r.board[i][2] = t
+	table = SYMMETRY_MASKS[t]
+	r.bits = [table[mask] for mask in state.bits]
+	r.update_tops()
+	r.key = r.zobrist_key()
 	return r
 
+def transform_move(move, t):
+	"""Returns a copy of a GobbletMove under symmetry t (see
+	SYMMETRY_CELLS)."""
+	detail = move.get_move()
+	cells = SYMMETRY_CELLS[t]
+	source = detail.source
+	if source:
+		source = CELLS[cells[3*source[0] + source[1]]]
+	target = CELLS[cells[3*detail.target[0] + detail.target[1]]]
+	return GobbletMove(GobbletMoveDetail(source, target, 
+						detail.piece.make_copy()), move.is_forfeit())
+
+def mirror(state):
+	"""Returns the mirror-image of the provided state."""
+	return transform(state, 4)
+
 def rotate(state):
 	"""Destructively rotates the provided state."""
-	r = state.make_copy()
-	newboard = [[[] for j in range(3)] for i in range(3)]
-	newboard[0][0] = r.board[2][0]
-	newboard[0][1] = r.board[1][0]
-	newboard[0][2] = r.board[0][0]
-	newboard[1][0] = r.board[2][1]
-	newboard[1][1] = r.board[1][1]
-	newboard[1][2] = r.board[0][1]
-	newboard[2][0] = r.board[2][2]
-	newboard[2][1] = r.board[1][2]
-	newboard[2][2] = r.board[0][2]
-	r.board = newboard
-	return r
+	return transform(state, 1)
 
 def rotations(state):
 	"""Returns the three rotated versions of the provided state."""
@@ -0,0 +1,109 @@
+import sys
+
+import gobblet
+
+# NumPy is optional: without it the batch functions below score the boards
+# one at a time and return lists instead of arrays.
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# Evaluation of Gobblet Gobblers positions, one at a time or many at once.
+#
+# The heuristic is the "open lines" count used by the example players: the
+# number of lines in which the opponent has no piece on top, for player 0
+# less that for player 1.  So, as in game_search, values are from player 0's
+# point of view, and positions won by player 0 or 1 score sys.maxint or
+# -sys.maxint-1.
+#
+# Scoring works on the packed board (see GobbletState): a lookup table maps
+# each 9-bit mask of a player's top pieces to its open-line count, and a
+# batch of boards, stacked into an n x 6 array of cell masks, is scored with
+# a handful of whole-array operations instead of a Python loop per board.
+
+# OPEN_LINES[mask] is the number of lines which have none of the cells in
+# "mask"
+OPEN_LINES = [len([line for line in gobblet.LINE_MASKS if not line & mask]) \
+				for mask in range(512)]
+
+# Below this many boards, the cost of building arrays outweighs vectorizing,
+# so evaluate_children() scores them one at a time.  Measured with
+# "game_bench.py -b", which times both ways at each batch size.  No Gobblet
+# position has this many moves, so the searches' batches, one node's
+# children, are always scored one at a time.
+BATCH_MIN = 192
+
+if numpy is not None:
+	OPEN_LINES_ARRAY = numpy.array(OPEN_LINES, dtype=numpy.int64)
+	WINNING_ARRAY = numpy.array(gobblet.WINNING, dtype=bool)
+
+def evaluate(state):
+	"""Returns the open-lines value of a GobbletState, from player 0's
+	point of view.  Doesn't check for wins (game_search does that before
+	evaluating)."""
+	return OPEN_LINES[state.tops[1]] - OPEN_LINES[state.tops[0]]
+
+def score_bits(bits, player):
+	"""Scores one board, as for evaluate_boards(), without NumPy."""
+	large = bits[2] | bits[5]
+	medium = bits[1] | bits[4]
+	tops = [bits[i + 2] | (bits[i + 1] & ~large) \
+				| (bits[i] & ~(large | medium)) for i in (0, 3)]
+	# A move that completes a line for both players goes to the mover
+	mover = 1 - player
+	if gobblet.WINNING[tops[mover]]:
+		winner = mover
+	elif gobblet.WINNING[tops[player]]:
+		winner = player
+	else:
+		return OPEN_LINES[tops[1]] - OPEN_LINES[tops[0]]
+	return sys.maxint if winner == 0 else -sys.maxint-1
+
+def evaluate_boards(boards, players):
+	"""Scores a batch of boards in one pass.
+
+	"boards" is a sequence of n boards, each as GobbletState.bits, or an
+	  n x 6 array of them.
+	"players" is a sequence of the n players to move.
+
+	Converting lists to arrays costs more than the scoring, so large
+	batches kept as arrays gain the most.
+
+	Returns an array of the n values (a list if NumPy isn't available)."""
+	if numpy is None:
+		return [score_bits(bits, player) \
+					for bits, player in zip(boards, players)]
+	bits = numpy.asarray(boards, dtype=numpy.int64).reshape(-1, 6)
+	players = numpy.asarray(players)
+	large = bits[:, 2] | bits[:, 5]
+	uncovered = ~(large | bits[:, 1] | bits[:, 4])
+	tops0 = bits[:, 2] | (bits[:, 1] & ~large) | (bits[:, 0] & uncovered)
+	tops1 = bits[:, 5] | (bits[:, 4] & ~large) | (bits[:, 3] & uncovered)
+	values = OPEN_LINES_ARRAY[tops1] - OPEN_LINES_ARRAY[tops0]
+	win0 = WINNING_ARRAY[tops0]
+	win1 = WINNING_ARRAY[tops1]
+	# A move that completes a line for both players goes to the mover
+	values[win0 & (~win1 | (players == 1))] = sys.maxint
+	values[win1 & (~win0 | (players == 0))] = -sys.maxint-1
+	return values
+
+def evaluate_children(state, moves):
+	"""Scores, in one batch, the positions each of "moves" leads to from a
+	GobbletState, returning a list of their values.  Suitable as the
+	"evaluate_children" argument of the searches in game_search, which
+	then score all the leaves under a node one ply from the horizon at
+	once.  The state is not changed and no expansions are used.  Batches
+	smaller than BATCH_MIN are scored without NumPy."""
+	boards = []
+	for move in moves:
+		i, source, target = state.move_cells(move)
+		bits = state.bits[:]
+		if source is not None:
+			bits[i] &= ~(1 << source)
+		bits[i] |= 1 << target
+		boards.append(bits)
+	player = 1 - state.player
+	if numpy is None or len(boards) < BATCH_MIN:
+		return [score_bits(bits, player) for bits in boards]
+	return evaluate_boards(boards, [player] * len(boards)).tolist()
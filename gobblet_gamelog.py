@@ -0,0 +1,127 @@
+import os
+import struct
+
+import gobblet
+
+# A game log file is laid out as
+#   MAGIC
+#   then records, each starting with a tag byte:
+#     TAG_PLAYERS: PLAYERS_HEADER (the lengths of two player names), then
+#       the names.  The games after it are between these two players.
+#     TAG_SEED: SEED_HEADER, the seed the next game was played with (see
+#       gobblet_selfplay).  Optional; logs written before seeds were
+#       recorded have none.
+#     TAG_GAME: GAME_HEADER (which of the two players moved first, the
+#       result and the number of moves), then one byte per move: its number
+#       in gobblet.MOVE_TABLE.
+# Results are RESULT_FIRST or RESULT_SECOND for a win by the player who
+# moved first or second, or RESULT_DRAW.  Files are only ever appended to,
+# so several runs can add games to the same log, each one starting with a
+# TAG_PLAYERS record.
+MAGIC = "GGGL0001"
+TAG_PLAYERS = "P"
+TAG_GAME = "G"
+TAG_SEED = "S"
+PLAYERS_HEADER = struct.Struct("<BB")
+SEED_HEADER = struct.Struct("<Q")
+GAME_HEADER = struct.Struct("<BBH")
+RESULT_FIRST = 0
+RESULT_SECOND = 1
+RESULT_DRAW = 2
+
+class GameLogWriter(object):
+	"""Appends games to a game log file, creating it if need be."""
+	def __init__(self, fname):
+		self.fname = fname
+		exists = os.path.exists(fname) and os.path.getsize(fname) > 0
+		if exists:
+			f = open(fname, "rb")
+			magic = f.read(len(MAGIC))
+			f.close()
+			if magic != MAGIC:
+				raise ValueError("%s is not a game log" % fname)
+		self.f = open(fname, "ab")
+		if not exists:
+			self.f.write(MAGIC)
+
+	def add_players(self, name1, name2):
+		"""Starts the games between the players with the indicated names."""
+		self.f.write(TAG_PLAYERS + PLAYERS_HEADER.pack(len(name1), len(name2))
+						+ name1 + name2)
+
+	def add_game(self, first, result, numbers, seed=None):
+		"""Records a game.
+
+		"first" is 0 if the first of the current players (see add_players())
+		  moved first, 1 if the second did.
+		"result" is one of RESULT_FIRST, RESULT_SECOND or RESULT_DRAW.
+		"numbers" is the list of the game's moves as their numbers in
+		  gobblet.MOVE_TABLE (see GobbletState.move_number()), or a string of
+		  one byte per move.
+		"seed" is the seed the game was played with (a non-negative integer
+		  below 2**64), or None."""
+		if not isinstance(numbers, str):
+			numbers = "".join([chr(k) for k in numbers])
+		if seed is not None:
+			self.f.write(TAG_SEED + SEED_HEADER.pack(seed))
+		self.f.write(TAG_GAME + GAME_HEADER.pack(first, result, len(numbers))
+						+ numbers)
+
+	def close(self):
+		self.f.close()
+
+def read_games(fname):
+	"""A generator of the games in a game log file, each as a 4-tuple
+	(players, result, numbers, seed): "players" is a 2-tuple of the names of
+	the players who moved first and second, "result" is one of the RESULT_
+	constants, "numbers" is the list of the moves' numbers and "seed" the
+	seed the game was played with, or None if none was recorded.
+
+	Raises ValueError if the file is not a game log or is cut short."""
+	f = open(fname, "rb")
+	try:
+		if f.read(len(MAGIC)) != MAGIC:
+			raise ValueError("%s is not a game log" % fname)
+		names = None
+		seed = None
+		while True:
+			tag = f.read(1)
+			if not tag:
+				break
+			if tag == TAG_PLAYERS:
+				lengths = PLAYERS_HEADER.unpack(read_exactly(f,
+												PLAYERS_HEADER.size))
+				names = (read_exactly(f, lengths[0]),
+						read_exactly(f, lengths[1]))
+			elif tag == TAG_GAME and names is not None:
+				first, result, n = GAME_HEADER.unpack(read_exactly(f,
+												GAME_HEADER.size))
+				players = names if first == 0 else (names[1], names[0])
+				yield (players, result, [ord(c) for c in read_exactly(f, n)],
+						seed)
+				seed = None
+			elif tag == TAG_SEED:
+				seed = SEED_HEADER.unpack(read_exactly(f,
+												SEED_HEADER.size))[0]
+			else:
+				raise ValueError("Bad record in game log %s" % fname)
+	finally:
+		f.close()
+
+def read_exactly(f, n):
+	"""Reads n bytes from a file, raising ValueError if it ends first."""
+	data = f.read(n)
+	if len(data) != n:
+		raise ValueError("Game log %s is cut short" % f.name)
+	return data
+
+def replay(numbers):
+	"""Returns the list of GobbletMoves for a game recorded as move
+	numbers, by playing it out from the opening position."""
+	state = gobblet.GobbletState()
+	moves = []
+	for k in numbers:
+		move = state.number_move(k)
+		moves.append(move)
+		state.move(move)
+	return moves
@@ -0,0 +1,295 @@
+import array
+import math
+import multiprocessing
+import random
+import time
+
+import game_controller
+
+# Monte Carlo tree search (UCT) for Gobblet Gobblers.
+#
+# The tree is kept in flat arrays indexed by node number rather than as one
+# Python object per node, so it costs a few dozen bytes per node and gives
+# the garbage collector nothing to track.  Node 0 is the root; the children
+# of a node are created together when it is expanded and sit next to each
+# other, so a node only records where its children start and how many there
+# are.
+#
+# Moves are stored as their numbers in gobblet.MOVE_TABLE, a byte each, and
+# the search works on the packed board with GobbletState.move_numbers() and
+# push_number(), so a playout makes no GobbletMove objects at all.
+#
+# parallel_search() grows several trees at once in worker processes
+# ("root parallelization"): each searches the same position independently,
+# with its own random numbers, and their root statistics are added up.
+
+# Rewards for the result of a playout, for the player who made a move
+WIN = 1.0
+DRAW = 0.5
+LOSS = 0.0
+
+class MCTSTree(object):
+	"""A UCT search tree grown from one GobbletState.
+
+	Each iteration walks down the tree choosing children by the UCB1 rule,
+	expands the node it stops at, plays the game out from there with random
+	moves and adds the result to the statistics of every node on the way
+	down.  Every playout uses one of the turn's expansions (see
+	GameState.use_expansion()), so the search keeps to the controller's
+	budget like the tree searches do.
+
+	Per node the arrays hold:
+	  visits -- the number of playouts through the node
+	  values -- the total reward of those playouts for the player who moved
+	    into the node
+	  first -- the index of the node's first child (-1 until it's expanded)
+	  counts -- the number of children (0 for an expanded node where the
+	    game is over)
+	  moves -- the number of the move into the node (see gobblet.MOVE_TABLE)
+
+	Not intended to be subclassed."""
+
+	# The UCB1 exploration constant
+	EXPLORATION = math.sqrt(2)
+	# Playouts longer than this many plies are counted as draws (Gobblet can
+	# go round in circles, which the controller declares a draw)
+	MAX_PLAYOUT = 60
+	# The tree stops growing at this many nodes (about 33 bytes each), and
+	# playouts then start from its leaves
+	MAX_NODES = 1 << 20
+
+	def __init__(self, state, rng=None, exploration=EXPLORATION,
+				maxNodes=MAX_NODES):
+		""""state" is the GobbletState to search from.  It is searched in
+		place with push_number() and pop_move() and left as it was found, and
+		its move counter is charged for the playouts.
+		"rng" is the random.Random to choose playout moves with (pass a
+		  seeded one for repeatable searches).
+		"exploration" is the UCB1 exploration constant.
+		"maxNodes" limits the size of the tree."""
+		self.state = state
+		self.rng = rng or random.Random()
+		self.exploration = exploration
+		self.maxNodes = maxNodes
+		self.visits = array.array('l', [0])
+		self.values = array.array('d', [0.0])
+		self.first = array.array('l', [-1])
+		self.counts = array.array('l', [0])
+		self.moves = array.array('B', [0])
+		self.playouts = 0
+
+	def size(self):
+		"""Returns the number of nodes in the tree."""
+		return len(self.visits)
+
+	def expand(self, node):
+		"""Creates the children of a node, one for each legal move in the
+		current state, in random order."""
+		numbers = self.state.move_numbers()
+		self.rng.shuffle(numbers)
+		self.first[node] = len(self.visits)
+		self.counts[node] = len(numbers)
+		n = len(numbers)
+		self.visits.extend([0] * n)
+		self.values.extend([0.0] * n)
+		self.first.extend([-1] * n)
+		self.counts.extend([0] * n)
+		self.moves.extend(numbers)
+
+	def select(self, node):
+		"""Returns the child of a node with the best UCB1 score (an unvisited
+		child if there is one)."""
+		visits = self.visits
+		values = self.values
+		first = self.first[node]
+		scale = self.exploration * math.sqrt(math.log(visits[node]))
+		best = -1
+		bestScore = None
+		for child in xrange(first, first + self.counts[node]):
+			n = visits[child]
+			if n == 0:
+				return child
+			score = values[child] / n + scale / math.sqrt(n)
+			if bestScore is None or score > bestScore:
+				best = child
+				bestScore = score
+		return best
+
+	def playout(self):
+		"""Plays random moves from the current state until someone wins or
+		MAX_PLAYOUT plies have been made, takes them back and returns the
+		winner (None for a draw)."""
+		state = self.state
+		rng = self.rng
+		winner = state.winner()
+		plies = 0
+		while winner is None and plies < MCTSTree.MAX_PLAYOUT:
+			numbers = state.move_numbers()
+			if not numbers:
+				break
+			state.push_number(numbers[int(rng.random() * len(numbers))])
+			plies += 1
+			winner = state.winner()
+		for k in xrange(plies):
+			state.pop_move()
+		return winner
+
+	def iterate(self):
+		"""Runs one selection-expansion-playout-update iteration."""
+		state = self.state
+		node = 0
+		path = [0]
+		# The players who moved into the nodes on the path
+		movers = [1 - state.player]
+		while self.first[node] >= 0 and self.counts[node] > 0 \
+				and state.winner() is None:
+			node = self.select(node)
+			movers.append(state.player)
+			state.push_number(self.moves[node])
+			path.append(node)
+		if self.first[node] < 0 and state.winner() is None \
+				and len(self.visits) < self.maxNodes:
+			self.expand(node)
+			if self.counts[node] > 0:
+				node = self.first[node]
+				movers.append(state.player)
+				state.push_number(self.moves[node])
+				path.append(node)
+		winner = self.playout()
+		for k in xrange(len(path) - 1):
+			state.pop_move()
+		for node, mover in zip(path, movers):
+			self.visits[node] += 1
+			if winner is None:
+				self.values[node] += DRAW
+			elif winner == mover:
+				self.values[node] += WIN
+		self.playouts += 1
+
+	def search(self, deadline=None, playouts=None):
+		"""Iterates while the turn's expansions last and, if a deadline (a
+		time.time() value) is given, until it passes, making at most
+		"playouts" playouts if that is given.  Returns the number of
+		playouts made.
+
+		Raises ValueError if nothing would stop the search: the state has no
+		move counter and neither a deadline nor "playouts" is given."""
+		state = self.state
+		if state.expansions_count() is None and deadline is None \
+				and playouts is None:
+			raise ValueError("MCTS search needs a move counter, a deadline "\
+								"or a number of playouts")
+		start = self.playouts
+		while (playouts is None or self.playouts - start < playouts) \
+				and state.use_expansion():
+			self.iterate()
+			if deadline is not None and time.time() >= deadline:
+				break
+		return self.playouts - start
+
+	def root_stats(self):
+		"""Returns a list of 3-tuples (move, visits, value), one for each
+		child of the root, the move as its number."""
+		first = self.first[0]
+		if first < 0:
+			return []
+		return [(self.moves[c], self.visits[c], self.values[c]) \
+					for c in xrange(first, first + self.counts[0])]
+
+def best_move(state, stats):
+	"""Returns the GobbletMove with the most visits in a list of root
+	statistics (as MCTSTree.root_stats()) for "state", or None if it is
+	empty.  Ties go to the move listed first."""
+	best = None
+	for move, visits, value in stats:
+		if best is None or visits > best[1]:
+			best = (move, visits)
+	if best is None:
+		return None
+	return state.number_move(best[0])
+
+def merge_stats(statsList):
+	"""Adds up the root statistics (as MCTSTree.root_stats()) of several
+	trees grown from the same state.  Returns a list like root_stats(),
+	sorted by move so that the result doesn't depend on the order of the
+	trees."""
+	totals = {}
+	for stats in statsList:
+		for move, visits, value in stats:
+			v, w = totals.get(move, (0, 0.0))
+			totals[move] = (v + visits, w + value)
+	return [(move,) + totals[move] for move in sorted(totals)]
+
+def tree_seed(seed, k):
+	"""Returns the seed for the random numbers of tree k of a parallel
+	search given "seed"."""
+	return seed * 1000003 + k
+
+def search_task(task):
+	"""Grows one tree of a parallel search (see parallel_search()), in
+	whatever process it is called in.
+
+	"task" is a 4-tuple (state, playouts, deadline, seed): the GobbletState
+	to search, the number of playouts allowed (None for no limit), the
+	deadline (a time.time() value, or None) and the seed for the tree's
+	random numbers (None for an unseeded search).  The playouts and the
+	deadline can't both be None (see MCTSTree.search()).
+
+	Returns a 2-tuple (stats, playouts): the tree's root_stats() and the
+	number of playouts made."""
+	state, playouts, deadline, seed = task
+	if playouts is not None:
+		state.set_counter(game_controller.GameExpansionCounter(playouts,
+																deadline))
+	tree = MCTSTree(state, random.Random(seed))
+	n = tree.search(deadline)
+	return (tree.root_stats(), n)
+
+# Worker processes for parallel_search(), kept between moves and games
+pool = None
+
+def worker_pool(processes):
+	"""Returns a multiprocessing.Pool of "processes" worker processes, shared
+	by every caller asking for that many, or None if this process can't
+	start workers of its own (as in the worker processes of a tournament run
+	with "game.py -j")."""
+	global pool
+	if multiprocessing.current_process().daemon:
+		return None
+	if pool is None or pool._processes != processes:
+		if pool is not None:
+			pool.terminate()
+		pool = multiprocessing.Pool(processes)
+	return pool
+
+def parallel_search(state, trees, pool=None, seed=None, deadline=None):
+	"""Root-parallel search: grows "trees" trees independently from
+	"state" and returns their merged root statistics (see merge_stats()).
+
+	The turn's remaining expansions are shared out evenly between the trees,
+	so the playouts still count against the controller's budget, and are
+	charged to "state" once the trees are done.  Each tree also stops at
+	the deadline (a time.time() value), if one is given, which is where more
+	processes pay off: in the same time they make more playouts.
+
+	"pool" is a multiprocessing.Pool to grow the trees in; without one,
+	  they are grown one after another in this process.
+	"seed", if given, seeds each tree's random numbers (see tree_seed()).
+	  A search limited by expansions rather than time then gives the same
+	  result every time, with or without a pool."""
+	budget = state.expansions_count()
+	tasks = []
+	for k in range(trees):
+		copy = state.make_copy()
+		copy.set_counter(None)
+		share = None
+		if budget is not None:
+			share = budget // trees + (1 if k < budget % trees else 0)
+		tasks.append((copy, share, deadline,
+					None if seed is None else tree_seed(seed, k)))
+	if pool is None:
+		results = [search_task(task) for task in tasks]
+	else:
+		results = pool.map(search_task, tasks)
+	state.use_expansions(sum([n for stats, n in results]))
+	return merge_stats([stats for stats, n in results])
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+
+import itertools
+import multiprocessing
+import optparse
+import os
+import random
+import sys
+
+import game
+import game_controller
+import gobblet
+import gobblet_gamelog
+from gobblet_gamelog import RESULT_FIRST, RESULT_SECOND, RESULT_DRAW
+
+USAGE_STRING = \
+"\nUsage 1: %prog [-n GAMES] [-j JOBS] [-e MAX_EXPAND] [-T SECONDS] [-s SEED] "\
+	"[-o PLIES] LOGFILE PLAYER1 PLAYER2\n"\
+"Usage 2: %prog -r LOGFILE\n\n"\
+"Plays games of Gobblet Gobblers between two players, with no output but a\n"\
+"count of the results, and appends them to the game log LOGFILE.  The\n"\
+"players take turns to move first.  Game k is played with the seed SEED + k,\n"\
+"which picks its random opening moves and seeds the players, and is logged\n"\
+"with it.  With -r, summarizes the games in LOGFILE."
+
+# Random moves each game starts with, so that deterministic players don't
+# play the same game over and over
+OPENING_PLIES = 2
+
+# Games handed to a worker process at a time
+CHUNK_SIZE = 16
+
+# What a worker process needs to play its games, as set up by init_worker():
+# a 5-tuple (controller, player modules, player names, seed, opening plies)
+worker = None
+
+def init_worker(playerNames, maxExpansions, moveTime, wd, seed, plies):
+	"""Sets up a process to play games, loading the player modules once for
+	all the games it plays."""
+	global worker
+	playerMods = [game.load_module(x, os.path.join(game.PLAYER_PATH,
+									"gobblet"), wd) for x in playerNames]
+	if None in playerMods:
+		sys.exit(2)
+	state = gobblet.make_state()
+	players = [game.call_name(playerMods[i], "make_player", playerNames[i],
+							i) for i in range(2)]
+	gm = game_controller.GameController(state, players,
+				[game_controller.GameController.TOURN] * 2, maxExpansions, wd,
+				moveTime)
+	worker = (gm, playerMods, playerNames, seed, plies)
+
+def game_seed(seed, k):
+	"""Returns the seed of game k of a run given "seed"."""
+	return (seed + k) % (1 << 64)
+
+def random_opening(rng, plies):
+	"""Returns a list of "plies" random moves from the opening position,
+	chosen with the random.Random "rng", none of which ends the game."""
+	state = gobblet.GobbletState()
+	moves = []
+	for ply in range(plies):
+		choices = [m for m in state.successor_moves() \
+					if state.move_copy(m)[1].winner() is None]
+		if not choices:
+			break
+		move = rng.choice(choices)
+		moves.append(move)
+		state.move(move)
+	return moves
+
+def play_selfplay_game(k):
+	"""Plays game k quietly in a process set up by init_worker().  The first
+	player moves first in the even-numbered games.  The game's seed picks
+	its opening moves and seeds the players (see GamePlayer.seed()).
+
+	Returns a 4-tuple (first, result, numbers, seed) for
+	gobblet_gamelog.GameLogWriter.add_game()."""
+	gm, playerMods, playerNames, seed, plies = worker
+	seed = game_seed(seed, k)
+	first = k % 2
+	order = [first, 1 - first]
+	players = [game.call_name(playerMods[p], "make_player", playerNames[p], i)
+				for i, p in enumerate(order)]
+	for i, player in enumerate(players):
+		player.seed(2 * seed + i)
+	gm.reset()
+	gm.setup_players(players, [game_controller.GameController.TOURN] * 2)
+	gm.play_moves(random_opening(random.Random(seed), plies))
+	winner = gm.play_game(True)
+	state = gobblet.GobbletState()
+	numbers = []
+	for move in gm.get_history():
+		numbers.append(state.move_number(move))
+		state.move(move)
+	if winner is None:
+		result = RESULT_DRAW
+	elif winner == 0:
+		result = RESULT_FIRST
+	else:
+		result = RESULT_SECOND
+	return (first, result, "".join([chr(n) for n in numbers]), seed)
+
+def self_play(logName, playerNames, games, jobs, maxExpansions, moveTime,
+				seed=0, plies=OPENING_PLIES):
+	"""Plays "games" games between the two named player modules in "jobs"
+	processes and appends them to the game log "logName".  Games are logged
+	in order as they finish.
+
+	Game k is played with the seed game_seed(seed, k), and starts with
+	"plies" random moves.
+
+	Returns a list of 3 counts: the first player's wins, the second
+	player's wins and the draws."""
+	wd = os.getcwd()
+	log = gobblet_gamelog.GameLogWriter(logName)
+	log.add_players(*playerNames)
+	pool = None
+	if jobs > 1:
+		pool = multiprocessing.Pool(jobs, init_worker,
+					(playerNames, maxExpansions, moveTime, wd, seed, plies))
+		results = pool.imap(play_selfplay_game, xrange(games), CHUNK_SIZE)
+	else:
+		init_worker(playerNames, maxExpansions, moveTime, wd, seed, plies)
+		results = itertools.imap(play_selfplay_game, xrange(games))
+	counts = [0, 0, 0]
+	try:
+		for first, result, numbers, gameSeed in results:
+			log.add_game(first, result, numbers, gameSeed)
+			if result == RESULT_DRAW:
+				counts[2] += 1
+			else:
+				# Which of the two players won
+				counts[first ^ result] += 1
+	finally:
+		log.close()
+		if pool != None:
+			pool.close()
+			pool.join()
+	return counts
+
+def summarize(logName):
+	"""Prints the number of games in a game log, and the results of each
+	pairing of players (first player listed first)."""
+	totals = {}
+	games = 0
+	moves = 0
+	for players, result, numbers, seed in \
+			gobblet_gamelog.read_games(logName):
+		counts = totals.setdefault(players, [0, 0, 0])
+		counts[result] += 1
+		games += 1
+		moves += len(numbers)
+	print "%d games, %d moves" % (games, moves)
+	for players in sorted(totals):
+		first, second, draws = totals[players]
+		print "%s vs. %s: %d won by %s, %d won by %s, %d drawn" \
+				% (players[0], players[1], first, players[0], second,
+					players[1], draws)
+
+def main():
+	parser = optparse.OptionParser()
+	parser.set_usage(USAGE_STRING)
+	parser.add_option("-n", "--games", type="int", dest="games",
+		help="Number of games to play (default=100)", metavar="GAMES")
+	parser.add_option("-j", "--jobs", type="int", dest="jobs",
+		help="Number of processes to play games in (default=number of CPUs)",
+		metavar="JOBS")
+	parser.add_option("-e", "--max-expand", type="int", dest="maxExpand",
+		help="Maximum number of expansions allowed per move (default=%d)" \
+			% game.MAX_EXPAND, metavar="MAX_EXPAND")
+	parser.add_option("-T", "--time", type="float", dest="moveTime",
+		help="Most time each player may take over a move, in seconds",
+		metavar="SECONDS")
+	parser.add_option("-s", "--seed", type="long", dest="seed",
+		help="Seed of the first game (default=random; printed)",
+		metavar="SEED")
+	parser.add_option("-o", "--opening", type="int", dest="plies",
+		help="Number of random moves each game starts with (default=%d)" \
+			% OPENING_PLIES, metavar="PLIES")
+	parser.add_option("-r", "--read", action="store_true", dest="read",
+		help="Summarize the games in LOGFILE instead of playing.")
+	parser.set_defaults(games=100, jobs=multiprocessing.cpu_count(),
+						maxExpand=game.MAX_EXPAND, plies=OPENING_PLIES,
+						read=False)
+	opts, args = parser.parse_args()
+
+	if opts.read:
+		if len(args) != 1:
+			print "Error: Reading a log requires 1 argument.  "\
+					"Use '-h' for more information."
+			sys.exit(1)
+		summarize(args[0])
+		return
+	if len(args) != 3:
+		print "Error: Self-play requires 3 arguments.  "\
+				"Use '-h' for more information."
+		sys.exit(1)
+	if opts.games < 1 or opts.jobs < 1 or opts.maxExpand < 1:
+		print "Error: GAMES, JOBS and MAX_EXPAND must be at least 1."
+		sys.exit(1)
+	if opts.moveTime is not None and opts.moveTime <= 0:
+		print "Error: SECONDS must be more than 0."
+		sys.exit(1)
+	if opts.plies < 0 or (opts.seed is not None and opts.seed < 0):
+		print "Error: SEED and PLIES must not be negative."
+		sys.exit(1)
+	seed = opts.seed
+	if seed is None:
+		seed = random.SystemRandom().getrandbits(32)
+	print "Seed:", seed
+
+	counts = self_play(args[0], args[1:], opts.games, opts.jobs,
+						opts.maxExpand, opts.moveTime, seed, opts.plies)
+	print "%s: %d, %s: %d, draws: %d" \
+			% (args[1], counts[0], args[2], counts[1], counts[2])
+
+if __name__ == "__main__":
+	main()
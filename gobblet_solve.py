@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+
+import itertools
+import optparse
+import sys
+
+import gobblet
+import gobblet_tablebase
+from gobblet_tablebase import UNKNOWN, WIN, LOSS, DRAW, VALUE_NAMES
+
+USAGE_STRING = \
+"\nUsage: %prog -p PIECES [-n] OUTFILE\n\n"\
+"Solves Gobblet Gobblers with PIECES pieces of each size per player by\n"\
+"retrograde analysis and writes the value of every position to the\n"\
+"tablebase file OUTFILE.  Only the reduced game, -p 1, is practical: it\n"\
+"takes about a minute.  -p 2 (the real game) walks every arrangement of\n"\
+"the pieces, with no reduction by symmetry or reachability, and takes days\n"\
+"and several gigabytes of memory"
+
+# Distances are stored in a byte each, and a position queued to be settled
+# in d plies is marked with d + 1
+MAX_DISTANCE = 254
+
+class GobbletSolver(gobblet_tablebase.PositionIndex):
+	"""Computes the exact game-theoretic value (win, loss or draw for the
+	player to move, plus the number of plies to the result) of every
+	arrangement of pieces on the board, which covers every reachable
+	GobbletState.
+
+	Placing a piece can't be undone, so the positions fall into "layers"
+	by how many of each kind of piece are on the board, and a move either
+	stays in its layer (moving a piece on the board) or goes to a layer
+	with one more piece placed.  Layers are solved from the fullest down:
+	each layer starts from the values of the layers its placements lead to
+	and is finished by retrograde analysis of its own moves, working back
+	from the positions whose results are already known.
+
+	As in GameController, a position in which the player who just moved
+	has three in a row is a loss for the player to move.  Positions from
+	which neither player can force a result are draws; the game can only go
+	on forever there by repeating positions, which GobbletState.handle_cycle()
+	declares a draw.  (Values are for the position alone: a losing player who
+	can repeat an earlier position of the game still gets a draw.)
+
+	Layers and the numbering of positions within them are as for
+	gobblet_tablebase.PositionIndex.
+
+	Each layer takes four bytes per position while it's solved, and the
+	finished layers one piece fuller are kept at two bytes per position.
+	That is fine for one piece of each size (1.5 million positions, solved
+	in about a minute), but the real game has 5.8 billion positions, 864
+	million in its largest layer, and at this pace takes days and several
+	gigabytes of memory to solve."""
+	def __init__(self, pieces=2):
+		""""pieces" is the number of pieces of each size each player has (2
+		in Gobblet Gobblers; smaller games are much quicker to solve)."""
+		gobblet_tablebase.PositionIndex.__init__(self, pieces)
+		# Used for its move-generation helpers on raw positions
+		self.scratch = gobblet.GobbletState()
+
+	def layers(self):
+		"""Returns every layer, those with the most pieces placed first."""
+		layers = list(itertools.product(range(self.pieces + 1), repeat=6))
+		layers.sort(key=lambda layer: -sum(layer))
+		return layers
+
+	def setup_scratch(self, bits, player):
+		"""Points the scratch state at a raw position and returns it."""
+		self.scratch.bits = bits
+		self.scratch.player = player
+		self.scratch.update_tops()
+		return self.scratch
+
+	def is_terminal(self, bits, player):
+		"""Returns True if the player who just moved has won."""
+		state = self.setup_scratch(bits, player)
+		return state.is_win(1 - player)
+
+	def children(self, layer, bits, player):
+		"""Returns a list of 3-tuples (i, source, target), as for
+		GobbletState.make_move(), giving the moves of the player to move."""
+		state = self.setup_scratch(bits, player)
+		moves = []
+		for size in range(3):
+			i = 3*player + size
+			if layer[i] >= self.pieces:
+				continue
+			blocked = state.blocked_cells(size)
+			for t in range(9):
+				if not blocked & (1 << t):
+					moves.append((i, None, t))
+		visible = state.visible_cells(player)
+		for s in range(9):
+			if not visible & (1 << s):
+				continue
+			i = 3*player + state.top_piece(s)[1]
+			blocked = state.blocked_cells(i % 3) | (1 << s)
+			for t in range(9):
+				if not blocked & (1 << t):
+					moves.append((i, s, t))
+		return moves
+
+	def predecessors(self, bits, player):
+		"""Returns the raw bits of the positions, in the same layer, from
+		which a move on the board by the other player leads to the indicated
+		position."""
+		state = self.setup_scratch(bits, player)
+		mover = 1 - player
+		preds = []
+		visible = state.visible_cells(mover)
+		for t in range(9):
+			if not visible & (1 << t):
+				continue
+			i = 3*mover + state.top_piece(t)[1]
+			# The piece came from a cell with only smaller pieces on it
+			blocked = state.blocked_cells(i % 3) | (1 << t)
+			for s in range(9):
+				if not blocked & (1 << s):
+					pred = bits[:]
+					pred[i] = (pred[i] & ~(1 << t)) | (1 << s)
+					preds.append(pred)
+		return preds
+
+	def solve_layer(self, layer, solved):
+		"""Solves one layer.  "solved" maps each layer with one more piece
+		placed to its (values, distances) bytearrays.
+
+		Returns the layer's (values, distances) bytearrays."""
+		n = self.layer_size(layer)
+		values = bytearray(n)
+		distances = bytearray(n)
+		# Number of moves to positions in this layer that aren't yet known
+		# to be wins for the opponent.  NO_LOSS marks positions with a move
+		# out of the layer that doesn't lose, which can't be losses.
+		NO_LOSS = 255
+		counts = bytearray(n)
+		# due[idx] is d + 1 for a position found to be worth values[idx] in
+		# d plies but not yet settled, or 0.  They're settled in order of d,
+		# found by scanning for each d in turn, so each one gets its
+		# quickest win or slowest loss.
+		due = bytearray(n)
+
+		for idx in xrange(n):
+			bits, player = self.position(layer, idx)
+			if self.is_terminal(bits, player):
+				self.push(values, due, idx, LOSS, 0)
+				continue
+			count = 0
+			win = None
+			for i, source, target in self.children(layer, bits, player):
+				if source is not None:
+					count += 1
+					continue
+				child = list(layer)
+				child[i] += 1
+				child = tuple(child)
+				childBits = bits[:]
+				childBits[i] |= 1 << target
+				c = self.index(child, childBits, 1 - player)
+				value = solved[child][0][c]
+				d = solved[child][1][c]
+				if value == LOSS:
+					count = NO_LOSS
+					if win is None or d < win:
+						win = d
+				elif value == WIN:
+					distances[idx] = max(distances[idx], d)
+				else:
+					count = NO_LOSS
+			if win is not None:
+				self.push(values, due, idx, WIN, win + 1)
+			if count == 0 and win is None:
+				self.push(values, due, idx, LOSS, distances[idx] + 1)
+			counts[idx] = min(count, NO_LOSS)
+
+		# Positions are only ever queued for later than the one being
+		# settled, so one scan for each distance finds them all
+		for d in range(MAX_DISTANCE + 1):
+			mark = chr(d + 1)
+			idx = due.find(mark)
+			while idx >= 0:
+				due[idx] = 0
+				value = values[idx]
+				distances[idx] = d
+				bits, player = self.position(layer, idx)
+				for pred in self.predecessors(bits, player):
+					p = self.index(layer, pred, 1 - player)
+					if values[p] != UNKNOWN and not due[p]:
+						continue
+					if value == LOSS:
+						self.push(values, due, p, WIN, d + 1)
+					elif counts[p] != NO_LOSS:
+						counts[p] -= 1
+						distances[p] = max(distances[p], d)
+						if counts[p] == 0:
+							self.push(values, due, p, LOSS, distances[p] + 1)
+				idx = due.find(mark, idx + 1)
+
+		# Whatever is left can't be forced either way
+		for idx in xrange(n):
+			if values[idx] == UNKNOWN:
+				values[idx] = DRAW
+				distances[idx] = 0
+		return (values, distances)
+
+	def push(self, values, due, idx, value, d):
+		"""Queues a position to be settled as worth "value" in d plies,
+		unless it's already queued to be settled sooner."""
+		if d > MAX_DISTANCE:
+			raise ValueError("Distance to result exceeds %d plies" \
+								% MAX_DISTANCE)
+		if not due[idx] or due[idx] > d + 1:
+			values[idx] = value
+			due[idx] = d + 1
+
+	def solve(self, writer, verbose=False):
+		"""Solves every layer, passing each to the add_layer() method of
+		"writer" (a gobblet_tablebase.TablebaseWriter), and returns the
+		(value, distance) of the opening position."""
+		layers = self.layers()
+		solved = {}
+		previous = {}
+		placed = None
+		for layer in layers:
+			# Only the layers one piece fuller are needed
+			if sum(layer) != placed:
+				placed = sum(layer)
+				previous, solved = solved, {}
+			if verbose:
+				print "Solving layer", layer, "(%d positions)" \
+						% self.layer_size(layer)
+				sys.stdout.flush()
+			solved[layer] = self.solve_layer(layer, previous)
+			writer.add_layer(layer, *solved[layer])
+		values, distances = solved[(0,) * 6]
+		start = self.index((0,) * 6, [0] * 6, 0)
+		return (values[start], distances[start])
+
+
+def main():
+	parser = optparse.OptionParser()
+	parser.set_usage(USAGE_STRING)
+	parser.add_option("-p", "--pieces", type="int", dest="pieces",
+		help="Number of pieces of each size per player (required; the "\
+		"real game has 2, which takes days to solve)",
+		metavar="PIECES")
+	parser.add_option("-n", "--no-distances", action="store_false",
+		dest="distances", help="Store only the values, not the distances.")
+	parser.add_option("-q", "--quiet", action="store_false", dest="verbose",
+		help="Don't report progress.")
+	parser.set_defaults(distances=True, verbose=True)
+	opts, args = parser.parse_args()
+	if len(args) != 1:
+		print "Error: Solving requires 1 argument.  "\
+				"Use '-h' for more information."
+		sys.exit(1)
+	if opts.pieces is None or opts.pieces < 1:
+		print "Error: -p PIECES is required, and must be at least 1."
+		sys.exit(1)
+
+	solver = GobbletSolver(opts.pieces)
+	writer = gobblet_tablebase.TablebaseWriter(args[0], opts.pieces,
+											opts.distances)
+	try:
+		value, distance = solver.solve(writer, opts.verbose)
+	finally:
+		writer.close()
+	print "Opening position is a %s for the first player in %d plies" \
+			% (VALUE_NAMES[value], distance)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,273 @@
+import mmap
+import struct
+import zlib
+
+# Values of positions, from the point of view of the player to move
+UNKNOWN = 0
+WIN = 1
+LOSS = 2
+DRAW = 3
+VALUE_NAMES = ["unknown", "win", "loss", "draw"]
+
+# A tablebase file is laid out as
+#   HEADER: MAGIC, pieces of each size per player, flags, positions per block
+#   the compressed blocks: for each block, its values (2 bits per position,
+#     first position in the low bits) and, if FLAG_DISTANCES is set, its
+#     distances (one byte per position)
+#   the directory: for each layer, LAYER_ENTRY (the layer, its number of
+#     positions and the number of its first block)
+#   the block index: BLOCK_ENTRY (the start and end offsets in the file) for
+#     each block's values, then, if the file has them, for its distances
+#   FOOTER: the offset of the directory, the number of layers and of blocks
+# Each layer starts a new block, so a position's block is found from its
+# layer's first block and its index within the layer.
+MAGIC = "GGTB0001"
+HEADER = struct.Struct("<8sBBI")
+LAYER_ENTRY = struct.Struct("<6BQI")
+BLOCK_ENTRY = struct.Struct("<QQ")
+FOOTER = struct.Struct("<QII")
+FLAG_DISTANCES = 1
+
+BLOCK_POSITIONS = 1 << 16
+
+def popcount(mask):
+	"""Returns the number of cells in a 9-bit cell mask."""
+	return bin(mask).count("1")
+
+# MASKS_BY_COUNT[n] lists the 9-bit cell masks with n cells in them
+MASKS_BY_COUNT = [[m for m in range(512) if popcount(m) == n] \
+					for n in range(10)]
+
+class PositionIndex(object):
+	"""Numbers the arrangements of Gobblet Gobblers pieces on the board.
+
+	Placing a piece can't be undone, so positions fall into "layers" by how
+	many of each kind of piece are on the board.  A layer is a 6-tuple giving
+	those numbers, in the same order as GobbletState.bits, and within a layer
+	each position has an index, see index()."""
+	def __init__(self, pieces=2):
+		""""pieces" is the number of pieces of each size each player has (2
+		in Gobblet Gobblers)."""
+		self.pieces = pieces
+		# configs[(n0, n1)] lists the ways n0 of player 0's and n1 of player
+		# 1's pieces of one size can sit on the board, as 18-bit numbers
+		# (player 0's cell mask above player 1's), and configIndex maps
+		# them back to their positions in that list
+		self.configs = {}
+		self.configIndex = {}
+		for n0 in range(pieces + 1):
+			for n1 in range(pieces + 1):
+				configs = [(m0 << 9) | m1 for m0 in MASKS_BY_COUNT[n0] \
+								for m1 in MASKS_BY_COUNT[n1] if not m0 & m1]
+				self.configs[(n0, n1)] = configs
+				self.configIndex[(n0, n1)] = \
+						dict([(c, i) for i, c in enumerate(configs)])
+
+	def layer_size(self, layer):
+		"""Returns the number of positions in a layer."""
+		n = 2
+		for size in range(3):
+			n *= len(self.configs[(layer[size], layer[3 + size])])
+		return n
+
+	def index(self, layer, bits, player):
+		"""Returns the index within its layer of the position with the
+		indicated piece masks (as GobbletState.bits) and player to move."""
+		idx = 0
+		for size in range(3):
+			key = (layer[size], layer[3 + size])
+			idx = idx * len(self.configs[key]) \
+					+ self.configIndex[key][(bits[size] << 9) | bits[3 + size]]
+		return 2*idx + player
+
+	def position(self, layer, idx):
+		"""The reverse of index(): returns a 2-tuple (bits, player)."""
+		player = idx % 2
+		idx //= 2
+		bits = [0] * 6
+		for size in (2, 1, 0):
+			configs = self.configs[(layer[size], layer[3 + size])]
+			idx, i = divmod(idx, len(configs))
+			bits[size] = configs[i] >> 9
+			bits[3 + size] = configs[i] & 511
+		return (bits, player)
+
+	def layer_of(self, state):
+		"""Returns the layer a GobbletState is in."""
+		return tuple([self.pieces - state.pieces_available(i // 3, i % 3) \
+						for i in range(6)])
+
+class TablebaseWriter(object):
+	"""Writes solved layers to a tablebase file.  Not intended to be
+	subclassed."""
+	def __init__(self, fname, pieces=2, distances=True,
+				blockPositions=BLOCK_POSITIONS):
+		""""fname" is the file to write.
+		"pieces" is as for PositionIndex.
+		"distances" says whether to store distances to the result as well as
+		  values.
+		"blockPositions" is the number of positions compressed together; it
+		  must be a multiple of 4."""
+		self.fout = open(fname, "wb")
+		self.distances = distances
+		self.blockPositions = blockPositions
+		self.directory = []
+		self.valueBlocks = []
+		self.distanceBlocks = []
+		self.fout.write(HEADER.pack(MAGIC, pieces,
+						FLAG_DISTANCES if distances else 0, blockPositions))
+
+	def add_layer(self, layer, values, distances):
+		"""Writes one layer.  "values" and "distances" are sequences with one
+		entry per position, in index order (distances are ignored if the file
+		doesn't keep them)."""
+		n = len(values)
+		self.directory.append(LAYER_ENTRY.pack(*(tuple(layer) \
+								+ (n, len(self.valueBlocks)))))
+		for start in xrange(0, n, self.blockPositions):
+			end = min(start + self.blockPositions, n)
+			packed = bytearray((end - start + 3) // 4)
+			for idx in xrange(start, end):
+				packed[(idx - start) >> 2] |= values[idx] << (2 * (idx & 3))
+			self.valueBlocks.append(self.write_block(packed))
+			if self.distances:
+				self.distanceBlocks.append(
+						self.write_block(distances[start:end]))
+
+	def write_block(self, data):
+		"""Compresses and writes one block, returning its BLOCK_ENTRY."""
+		start = self.fout.tell()
+		self.fout.write(zlib.compress(str(data)))
+		return BLOCK_ENTRY.pack(start, self.fout.tell())
+
+	def close(self):
+		"""Writes the directory and block index and closes the file."""
+		directory = self.fout.tell()
+		self.fout.write("".join(self.directory))
+		self.fout.write("".join(self.valueBlocks))
+		self.fout.write("".join(self.distanceBlocks))
+		self.fout.write(FOOTER.pack(directory, len(self.directory),
+						len(self.valueBlocks)))
+		self.fout.close()
+
+class Tablebase(object):
+	"""Looks up solved positions in a tablebase file.
+
+	The file is only opened on the first lookup, and then memory-mapped:
+	each lookup finds its block through the index and decompresses just
+	that block, so neither creating a Tablebase (e.g., when a player module
+	is imported) nor using it reads the whole file.  Not intended to be
+	subclassed."""
+
+	# Number of decompressed blocks kept around
+	CACHE_BLOCKS = 64
+
+	def __init__(self, fname):
+		""""fname" is the tablebase file, as written by TablebaseWriter."""
+		self.fname = fname
+		self.mm = None
+
+	def open(self):
+		"""Maps the file and reads its directory (done automatically by the
+		first lookup)."""
+		fin = open(self.fname, "rb")
+		try:
+			self.mm = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+		finally:
+			fin.close()
+		magic, pieces, flags, self.blockPositions = \
+				HEADER.unpack_from(self.mm, 0)
+		if magic != MAGIC:
+			raise ValueError("%s is not a tablebase file" % self.fname)
+		self.hasDistances = bool(flags & FLAG_DISTANCES)
+		self.positionIndex = PositionIndex(pieces)
+		directory, layers, self.blocks = \
+				FOOTER.unpack_from(self.mm, len(self.mm) - FOOTER.size)
+		self.layers = {}
+		for i in range(layers):
+			entry = LAYER_ENTRY.unpack_from(self.mm,
+							directory + i * LAYER_ENTRY.size)
+			self.layers[tuple(entry[:6])] = entry[7]
+		self.valueIndex = directory + layers * LAYER_ENTRY.size
+		self.distanceIndex = self.valueIndex + self.blocks * BLOCK_ENTRY.size
+		self.cache = {}
+
+	def close(self):
+		"""Unmaps the file."""
+		if self.mm is not None:
+			self.mm.close()
+			self.mm = None
+
+	def block(self, index, k):
+		"""Returns decompressed block k of the stream whose block index starts
+		at "index"."""
+		if (index, k) not in self.cache:
+			if len(self.cache) >= Tablebase.CACHE_BLOCKS:
+				self.cache.clear()
+			start, end = BLOCK_ENTRY.unpack_from(self.mm,
+								index + k * BLOCK_ENTRY.size)
+			self.cache[(index, k)] = zlib.decompress(self.mm[start:end])
+		return self.cache[(index, k)]
+
+	def covers(self, state):
+		"""Returns True if a GobbletState is of the game the file was solved
+		for: each player has as many pieces of each size, on the board and
+		off it, as the file's header says."""
+		if self.mm is None:
+			self.open()
+		pieces = self.positionIndex.pieces
+		for i in range(6):
+			if popcount(state.bits[i]) + state.pieces[i] != pieces:
+				return False
+		return True
+
+	def lookup(self, state):
+		"""Returns a 2-tuple (value, distance) for a GobbletState: the value
+		(WIN, LOSS or DRAW) for the player to move, and the number of plies to
+		the result (None if the file has no distances).
+
+		Raises ValueError if the file is for a game with a different number
+		of pieces (see covers())."""
+		if not self.covers(state):
+			raise ValueError("%s is for games with %d of each kind of piece "\
+							"per player, which this position doesn't have" \
+							% (self.fname, self.positionIndex.pieces))
+		layer = self.positionIndex.layer_of(state)
+		idx = self.positionIndex.index(layer, state.bits, state.player)
+		k, i = divmod(idx, self.blockPositions)
+		k += self.layers[layer]
+		value = (ord(self.block(self.valueIndex, k)[i >> 2]) \
+					>> (2 * (i & 3))) & 3
+		distance = None
+		if self.hasDistances:
+			distance = ord(self.block(self.distanceIndex, k)[i])
+		return (value, distance)
+
+	def best_move(self, state):
+		"""Returns the best move for the player to move in a GobbletState:
+		the quickest win if there is one, else a draw, else the slowest loss.
+		Returns None if the game is over or there are no expansions left.
+
+		Asks the state for its successor moves, so it uses one expansion.
+		Raises ValueError as lookup() does."""
+		if state.winner() is not None:
+			return None
+		moves = state.successor_moves()
+		if moves is None:
+			return None
+		best = None
+		for move in moves:
+			state.push_move(move)
+			value, distance = self.lookup(state)
+			state.pop_move()
+			distance = distance or 0
+			# Rank the moves by the opponent's result
+			if value == LOSS:
+				rank = (2, -distance)
+			elif value == DRAW:
+				rank = (1, 0)
+			else:
+				rank = (0, distance)
+			if best is None or rank > best[0]:
+				best = (rank, move)
+		return best[1] if best else None
@@ -0,0 +1,57 @@
+import os
+
+import game_player
+import gobblet
+import gobblet_eval
+import gobblet_tablebase
+
+
+# A GobbletPlayer agent which plays perfectly from a tablebase (see
+# gobblet_solve.py) wherever it has one for the game being played, and
+# otherwise searches with principal-variation search and the open-lines
+# evaluation.
+#
+# The tablebase is TABLEBASE_FILE, next to this module, as made by
+#   ./gobblet_solve.py -p PIECES players/gobblet/gobblet.gtb
+# (only -p 1 is practical to solve; see gobblet_solve.py).  If there is no
+# such file, or it was solved for a game with fewer pieces, the player just
+# searches.
+TABLEBASE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+								"gobblet.gtb")
+
+class GobbletPlayer(game_player.SearchPlayer):
+
+	# Moves are stored in the transposition table as integers
+	MOVE_CODES = True
+
+	# Make a note of our name and player ID
+	# see comments on GamePlayer for more details
+	def __init__(self, name, game_id):
+		game_player.SearchPlayer.__init__(self, name, game_id)
+		# Only opened on the first lookup
+		self.tablebase = None
+		if os.path.exists(TABLEBASE_FILE):
+			self.tablebase = gobblet_tablebase.Tablebase(TABLEBASE_FILE)
+
+	# "state" is a GobbletState object
+	def evaluate(self, state):
+		return gobblet_eval.evaluate(state)
+
+	def encode_move(self, move):
+		return gobblet.move_code(move)
+
+	def decode_move(self, code):
+		return gobblet.code_move(code)
+
+	# Take the tablebase's best move if it covers the game, and search if
+	# it doesn't (or there's no expansion left to list the moves with)
+	def tournament_move(self, state, visited):
+		if self.tablebase is not None and self.tablebase.covers(state):
+			move = self.tablebase.best_move(state)
+			if move is not None:
+				return move
+		return self.alpha_beta_move(state, visited)
+
+
+def make_player(name, gameID):
+	return GobbletPlayer(name, gameID)
@@ -0,0 +1,41 @@
+import multiprocessing
+
+import game_player
+import gobblet
+import gobblet_eval
+
+
+# A GobbletPlayer agent searching with principal-variation search and the
+# open-lines evaluation, in this process and one helper process per other
+# CPU (Lazy SMP, see game_smp), all sharing one transposition table.  The
+# processes share the turn's expansions, so it gets ahead of a single search
+# when moves are timed (game.py -T).  The leaves under each position one ply
+# from the horizon are scored together (see gobblet_eval.evaluate_children).
+class GobbletPlayer(game_player.SearchPlayer):
+
+	HELPERS = max(1, multiprocessing.cpu_count() - 1)
+	# Moves are stored in the transposition tables as integers
+	MOVE_CODES = True
+	BATCH_EVALUATE = True
+
+	# Make a note of our name and player ID
+	# see comments on GamePlayer for more details
+	def __init__(self, name, game_id):
+		game_player.SearchPlayer.__init__(self, name, game_id)
+
+	# "state" is a GobbletState object
+	def evaluate(self, state):
+		return gobblet_eval.evaluate(state)
+
+	def evaluate_children(self, state, moves):
+		return gobblet_eval.evaluate_children(state, moves)
+
+	def encode_move(self, move):
+		return gobblet.move_code(move)
+
+	def decode_move(self, code):
+		return gobblet.code_move(code)
+
+
+def make_player(name, gameID):
+	return GobbletPlayer(name, gameID)
@@ -0,0 +1,73 @@
+import random
+import time
+
+import game_state
+import game_player
+import gobblet
+import gobblet_mcts
+
+
+# A Monte Carlo tree search (UCT) GobbletPlayer agent.
+#
+# Instead of evaluating positions, it plays lots of random games out from
+# them (one per expansion it's allowed) and picks the move that the search
+# spent most of its playouts on.
+#
+# With TREES above 1, it grows that many trees at once in worker processes
+# (see gobblet_mcts.parallel_search()) and takes the move with the most
+# visits over all of them.
+class GobbletPlayer(game_player.GamePlayer):
+
+	# The number of trees grown each move
+	TREES = 1
+
+	# Make a note of our name and player ID
+	# see comments on GamePlayer for more details
+	def __init__(self, name, game_id):
+		game_player.GamePlayer.__init__(self, name, game_id)
+		# Seeded, so games against deterministic players can be replayed
+		self.rng = random.Random(0)
+
+	# Games with the same seed play out the same way
+	def seed(self, seed):
+		self.rng.seed(seed)
+
+	# Playouts don't need an evaluation function, so just return 0
+	#
+	# "state" is a GobbletState object
+	def evaluate(self, state):
+		return 0
+
+	# Grow a search tree from the state until the expansions (or the time,
+	# if the controller set a limit) run out, and take the most-visited move.
+	#
+	# "state" is a GobbletState object
+	def mcts_move(self, state):
+		deadline = None
+		remaining = state.time_remaining()
+		if remaining is not None:
+			deadline = time.time() \
+						+ remaining * game_player.GamePlayer.TIME_SAFETY
+		if self.TREES > 1:
+			stats = gobblet_mcts.parallel_search(state, self.TREES,
+							gobblet_mcts.worker_pool(self.TREES),
+							self.rng.getrandbits(31), deadline)
+			return gobblet_mcts.best_move(state, stats)
+		tree = gobblet_mcts.MCTSTree(state, self.rng)
+		tree.search(deadline)
+		return gobblet_mcts.best_move(state, tree.root_stats())
+
+	# Monte Carlo search takes the place of minimax
+	def minimax_move(self, state, visited):
+		return self.mcts_move(state)
+
+	# And of alpha-beta
+	def alpha_beta_move(self, state, visited):
+		return self.mcts_move(state)
+
+	def tournament_move(self, state, visited):
+		return self.mcts_move(state)
+
+
+def make_player(name, gameID):
+	return GobbletPlayer(name, gameID)
@@ -0,0 +1,16 @@
+import multiprocessing
+
+import gobblet_uct
+
+
+# The UCT GobbletPlayer agent, growing one tree per CPU at each move in
+# separate processes (root parallelization).  The trees share the turn's
+# expansions, so it only plays better than gobblet_uct when moves are timed
+# (game.py -T), when it makes more playouts in the time.
+class GobbletPlayer(gobblet_uct.GobbletPlayer):
+
+	TREES = max(2, multiprocessing.cpu_count())
+
+
+def make_player(name, gameID):
+	return GobbletPlayer(name, gameID)
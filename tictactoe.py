@@ -20,6 +20,19 @@ class TicTacToeMove(game_state.GameMove):
 			% (TicTacToeState.val_to_char(self.player), \
 				str(self.move+1) if self.move != None else "(None)")
 	
+	def __eq__(self, other):
+		"""Moves are equal if the same player moves to the same square"""
+		if not isinstance(other, TicTacToeMove):
+			return False
+		return (self.player, self.move, self.forfeit) \
+				== (other.player, other.move, other.forfeit)
+	
+	def __ne__(self, other):
+		return not self == other
+	
+	def __hash__(self):
+		return hash((self.player, self.move, self.forfeit))
+	
 	def get_player(self):
 		"""Returns the TicTacToePlayer object who's moving"""
 		return self.player
@@ -54,6 +67,7 @@ class TicTacToeState(game_state.GameState):
 	
 	def __init__(self):
 		"""Player X goes first"""
+		game_state.GameState.__init__(self)
 		self.clear()
 	
 	# Returns an informal string representation of the board
@@ -154,6 +168,18 @@ class TicTacToeState(game_state.GameState):
 		self.player = (self.player % 2) + 1
 		return (self.player, False)
 	
+	def push_move(self, move):
+		"""Like move(), but remembers the move so pop_move() can take it back."""
+		player, clear = self.move(move)
+		if player is not None:
+			self.moveStack.append(move.get_move())
+		return (player, clear)
+	
+	def pop_move(self):
+		"""Takes back the last move made with push_move()."""
+		self.board[self.moveStack.pop()] = TicTacToeState.EMPTY
+		self.player = (self.player % 2) + 1
+	
 	def successor_moves(self):
 		"""Returns a list of the valid moves which may be performed on this state,
 		or None if the game controller refuses to allow any more expansions
@@ -163,14 +189,24 @@ class TicTacToeState(game_state.GameState):
 		made on this state.
 		
 		Each move in the list is a TicTacToeMove object."""
-		moves = game_state.GameState.successor_moves(self)
+		moves = self.iter_successor_moves()
 		if(moves == None):
 			return None
+		return list(moves)
+	
+	def iter_successor_moves(self):
+		"""Like successor_moves(), but returns an iterator which makes each
+		TicTacToeMove as it is needed (see GameState.iter_successor_moves())."""
+		if(game_state.GameState.successor_moves(self) == None):
+			return None
+		return self.generate_moves()
+	
+	def generate_moves(self):
+		"""A generator of the valid TicTacToeMoves on this state."""
 		for i in range(9):
 			move = TicTacToeMove(self.player, i)
 			if(self.is_valid_move(move)):
-				moves.append(move)
-		return moves
+				yield move
 
 def make_state():
 	return TicTacToeState()
\ No newline at end of file